@@ -0,0 +1,65 @@
+# -*- coding: utf-8 -*-
+""" Compare PriorityChainMap lookup latency against the previous implementation, which sorted and flattened the mapping
+order on every access.
+
+Run with `python -m benchmarks.chain` from the repository root.
+"""
+import timeit
+from collections import defaultdict
+from typing import Any, Dict, Iterable, List, Mapping
+
+from plenary.chain import PriorityChainMap
+from plenary.iterate import nested_flatten
+
+LAYER_COUNTS = (5, 50, 500)
+LAYER_KEYS = 10
+REPEAT = 5
+
+
+class SortedPriorityChainMap:
+    """ Lookup path of PriorityChainMap prior to precompiling the mapping order. """
+
+    def __init__(self, *initial: Mapping[Any, Any]):
+        self._maps: Dict[int, List[Mapping[Any, Any]]] = defaultdict(list)
+
+        for m in initial:
+            self._maps[0].insert(0, m)
+
+    def _map_iterable(self) -> Iterable[Mapping[Any, Any]]:
+        return nested_flatten(v[::1] for k, v in sorted(self._maps.items(), key=lambda p: p[0]))
+
+    def __getitem__(self, k: Any) -> Any:
+        for m in self._map_iterable():
+            try:
+                return m[k]
+            except KeyError:
+                continue
+
+        raise KeyError(k)
+
+
+def _best(stmt: str, namespace: Dict[str, Any], number: int) -> float:
+    return min(timeit.repeat(stmt, globals=namespace, number=number, repeat=REPEAT)) / number
+
+
+def main() -> None:
+    print(f"{'layers':>8} {'key':>8} {'sorted (us)':>12} {'compiled (us)':>14} {'cached (us)':>12}")
+
+    for count in LAYER_COUNTS:
+        layers = [{(n, k): k for k in range(LAYER_KEYS)} for n in range(count)]
+        number = max(10, 20000 // count)
+
+        maps = {
+            'sorted': SortedPriorityChainMap(*layers),
+            'compiled': PriorityChainMap(*layers),
+            'cached': PriorityChainMap(*layers, cached=True)
+        }
+
+        # Most recent layer has highest priority, so the first layer is found last
+        for label, key in (('first', (count - 1, 0)), ('last', (0, 0))):
+            timings = [_best('m[key]', {'m': m, 'key': key}, number) * 1e6 for m in maps.values()]
+            print(f"{count:>8} {label:>8} {timings[0]:>12.2f} {timings[1]:>14.2f} {timings[2]:>12.2f}")
+
+
+if __name__ == '__main__':
+    main()
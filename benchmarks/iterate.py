@@ -0,0 +1,200 @@
+# -*- coding: utf-8 -*-
+""" Benchmarks for plenary.iterate.
+
+Run with `python -m benchmarks.iterate [--rows N]` from the repository root. Streaming benchmarks default to 1M rows,
+pass --rows 100000000 for the full-size comparison.
+"""
+import argparse
+import collections.abc
+import os
+import sys
+import time
+import timeit
+import tracemalloc
+from itertools import chain
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Tuple
+
+from plenary import iterate, localtime
+
+REPEAT = 5
+
+
+def _best(stmt: str, namespace: Dict[str, Any], number: int = 1) -> float:
+    return min(timeit.repeat(stmt, globals=namespace, number=number, repeat=REPEAT)) / number
+
+
+def recursive_flatten(iterable: Iterable[Any], flatten_str: bool = False) -> Iterator[Any]:
+    """ Implementation of flatten prior to using an explicit stack. """
+    for item in iterable:
+        if isinstance(item, str):
+            if len(item) == 1:
+                yield item[0]
+            elif flatten_str:
+                for char in item:
+                    yield char
+            else:
+                yield item
+        elif isinstance(item, collections.abc.Iterable):
+            for sub_item in recursive_flatten(item, flatten_str):
+                yield sub_item
+        else:
+            yield item
+
+
+def _nest(leaves: List[Any], depth: int) -> List[Any]:
+    data: List[Any] = leaves
+
+    for _ in range(depth):
+        data = [data]
+
+    return data
+
+
+def bench_flatten() -> None:
+    leaf_count = 10000
+    implementations: Dict[str, Callable[..., Iterator[Any]]] = {
+        'recursive': recursive_flatten,
+        'stack': iterate.flatten
+    }
+
+    print('flatten: throughput of 10k leaves nested below increasing depth (M items/s)')
+    print(f"{'depth':>8}" + ''.join(f"{label:>12}" for label in implementations))
+
+    for depth in (1, 10, 100, 500, 5000):
+        data = _nest(list(range(leaf_count)), depth)
+        row = f"{depth:>8}"
+
+        for func in implementations.values():
+            if depth >= sys.getrecursionlimit() and func is recursive_flatten:
+                row += f"{'overflow':>12}"
+                continue
+
+            duration = _best('for _ in func(data): pass', {'func': func, 'data': data})
+            row += f"{leaf_count / duration / 1e6:>12.2f}"
+
+        print(row)
+
+
+def bench_flatten_flat() -> None:
+    data = [[float(n), n] * 50 for n in range(1000)]
+    leaf_count = 100000
+
+    print('flatten: throughput of 100k int/float leaves in lists of 100 (M items/s)')
+
+    for label, func in (('recursive', recursive_flatten), ('stack', iterate.flatten)):
+        duration = _best('for _ in func(data): pass', {'func': func, 'data': data})
+        print(f"{label:>12} {leaf_count / duration / 1e6:>8.2f}")
+
+
+def cpu_bound(n: int) -> int:
+    total = 0
+
+    for x in range(20000):
+        total += (x * n) % 7
+
+    return total
+
+
+def bench_parallel_map() -> None:
+    data = range(1000)
+    cpu_count = os.cpu_count() or 1
+
+    print(f"parallel_map: CPU-bound function over {len(data)} items ({cpu_count} CPUs)")
+
+    start = time.perf_counter()
+    expected = list(map(cpu_bound, data))
+    serial = time.perf_counter() - start
+    print(f"{'serial':>12} {serial:>8.2f} s")
+
+    for executor in ('thread', 'process'):
+        for workers in sorted({1, 2, cpu_count}):
+            start = time.perf_counter()
+            result = list(iterate.parallel_map(cpu_bound, data, 50, executor, max_workers=workers))
+            duration = time.perf_counter() - start
+
+            assert result == expected
+            print(f"{executor:>8} x{workers:<3} {duration:>8.2f} s  speed-up {serial / duration:.2f}")
+
+
+def _sensor_stream(sensor: int, count: int, numeric_utc: bool) -> Iterator[Tuple[Any, int]]:
+    for n in range(count):
+        yield localtime.parse_datetime(1660000000 + n * 10 + sensor, numeric_utc), sensor
+
+
+def bench_merge_sorted(rows: int) -> None:
+    streams = 20
+    count = rows // streams
+
+    print(f"merge_sorted: {streams} timestamped streams, {count * streams} rows (s, including parsing)")
+
+    for numeric_utc in (True, False):
+        label = 'UTC' if numeric_utc else 'local'
+
+        start = time.perf_counter()
+        merged = 0
+
+        for _ in iterate.merge_sorted(*(_sensor_stream(n, count, numeric_utc) for n in range(streams)),
+                                      key=lambda x: x[0]):
+            merged += 1
+
+        duration = time.perf_counter() - start
+        print(f"{label:>8} {'merge_sorted':>14} {duration:>8.2f}")
+
+        start = time.perf_counter()
+        result = sorted(chain(*(_sensor_stream(n, count, numeric_utc) for n in range(streams))), key=lambda x: x[0])
+        duration = time.perf_counter() - start
+        print(f"{label:>8} {'sorted(chain)':>14} {duration:>8.2f}")
+
+        assert merged == len(result)
+        del result
+
+
+def bench_unique(rows: int) -> None:
+    distinct = rows // 2
+    bound = 100000
+
+    def events() -> Iterator[int]:
+        # Every event ID is repeated once, a short distance after its first occurrence
+        for n in range(distinct):
+            yield n
+            yield n - 10
+
+    modes: Dict[str, Dict[str, Any]] = {
+        'set': {},
+        'lru': {'max_items': bound},
+        'bloom': {'max_items': bound, 'error_rate': 0.001}
+    }
+
+    print(f"unique: {2 * distinct} events, bounded modes remember {bound} keys")
+    print(f"{'mode':>8} {'M items/s':>10} {'peak MiB':>10} {'output':>12}")
+
+    for label, kwargs in modes.items():
+        start = time.perf_counter()
+        output = sum(1 for _ in iterate.unique(events(), **kwargs))
+        duration = time.perf_counter() - start
+
+        # Memory is measured on a separate, shorter run as tracing slows allocation substantially
+        sample = min(distinct, 2 * bound)
+        tracemalloc.start()
+        for _ in iterate.unique((n for n in range(sample) for n in (n, n - 10)), **kwargs):
+            pass
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+
+        print(f"{label:>8} {2 * distinct / duration / 1e6:>10.2f} {peak / 2 ** 20:>10.2f} {output:>12}")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--rows', type=int, default=1000000, help='number of rows for streaming benchmarks')
+    args = parser.parse_args()
+
+    bench_flatten()
+    bench_flatten_flat()
+    bench_parallel_map()
+    bench_merge_sorted(args.rows)
+    bench_unique(args.rows)
+
+
+if __name__ == '__main__':
+    main()
@@ -1,12 +1,19 @@
 # -*- coding: utf-8 -*-
-from collections import defaultdict
-from typing import (Dict, Generic, Iterable, Iterator, List, Mapping, Set,
-                    TypeVar)
+import typing
+from bisect import insort
+from collections import deque
+from threading import Lock
+from types import MappingProxyType
+from typing import (Any, Callable, Deque, Dict, Generic, Iterable, Iterator,
+                    KeysView, List, Mapping, NamedTuple, Optional, Set, Tuple,
+                    TypeVar, Union)
 
 from plenary.iterate import nested_flatten
 
 __all__ = [
-    'PriorityChainMap'
+    'ChainResolution',
+    'PriorityChainMap',
+    'ConcurrentPriorityChainMap'
 ]
 
 
@@ -14,56 +21,566 @@ _K = TypeVar('_K')
 _V = TypeVar('_V')
 
 
+TMapLoader = Callable[[], Mapping[_K, _V]]
+TChainLayer = Union[Mapping[_K, _V], TMapLoader[_K, _V]]
+
+_TCache = Dict[_K, Mapping[_K, _V]]
+_TIndex = Dict[_K, Mapping[_K, _V]]
+_TChildren = Dict[_K, Tuple[Tuple[Mapping[_K, _V], ...], 'PriorityChainMap[Any, Any]']]
+
+
+class ChainResolution(NamedTuple):
+    """ Value resolved from a PriorityChainMap along with the position of the mapping that supplied it. """
+    value: Any
+    order: int
+    position: int
+
+
+class _LazyMapping(Mapping[_K, _V], Generic[_K, _V]):
+    """ Mapping that defers calling a loader until its contents are first required. """
+
+    def __init__(self, loader: TMapLoader[_K, _V]):
+        self.loader = loader
+        self._target: Optional[Mapping[_K, _V]] = None
+        self._target_lock = Lock()
+
+    @property
+    def loaded(self) -> bool:
+        return self._target is not None
+
+    @property
+    def target(self) -> Mapping[_K, _V]:
+        if self._target is None:
+            with self._target_lock:
+                # Another thread may have loaded the target while waiting
+                if self._target is None:
+                    self._target = self.loader()
+
+        return self._target
+
+    def keys(self) -> KeysView[_K]:
+        return self.target.keys()
+
+    def __contains__(self, __k: Any) -> bool:
+        return __k in self.target
+
+    def __getitem__(self, __k: _K) -> _V:
+        return self.target[__k]
+
+    def __len__(self) -> int:
+        return len(self.target)
+
+    def __iter__(self) -> Iterator[_K]:
+        return iter(self.target)
+
+
 class PriorityChainMap(Mapping[_K, _V], Generic[_K, _V]):
-    def __init__(self, *initial: Mapping[_K, _V]):
-        self._maps: Mapping[int, List[Mapping[_K, _V]]] = defaultdict(list)
+    def __init__(self, *initial: TChainLayer[_K, _V], indexed: bool = False, cached: bool = False,
+                 nested: bool = False):
+        """ Create a new chain of mappings, later initial mappings take priority over earlier ones.
+
+        A mapping supplies a key only if it contains that key, defaults from mappings defining __missing__ (eg. Counter
+        or defaultdict) are not used and do not shadow lower priority mappings.
+
+        :param initial: mappings or mapping loaders to insert into the chain
+        :param indexed: if True maintain an index of each key to the mapping that supplies it, allowing length,
+            iteration and membership checks without visiting every mapping. Mappings should not be modified after
+            insertion in this mode
+        :param cached: if True remember which mapping supplied each key as keys are looked up. If a mapping is modified
+            after insertion invalidate() must be called
+        :param nested: if True mapping values are merged across mappings, returned as a chain of the mapping values for
+            the same key in each mapping. Nested chains are created once per key and share the indexed and cached
+            behaviour of the parent
+        """
+        self._maps: Dict[int, Deque[Mapping[_K, _V]]] = {}
+        self._orders: List[int] = []
+        self._layers: Tuple[Mapping[_K, _V], ...] = ()
+        self._layers_reversed: Tuple[Mapping[_K, _V], ...] = ()
+        self._positions: Dict[int, Tuple[int, int]] = {}
+        self._index: Optional[_TIndex[_K, _V]] = {} if indexed else None
+        self._cache: Optional[_TCache[_K, _V]] = {} if cached and not indexed else None
+        self._children: Optional[_TChildren[_K, _V]] = {} if nested else None
+        self._version = 0
+        self._frozen: Optional[Tuple[int, Mapping[_K, _V]]] = None
 
         for m in initial:
             self.insert(m)
 
+    @property
+    def indexed(self) -> bool:
+        """ True if the chain maintains a merged key index. """
+        return self._index is not None
+
+    @property
+    def nested(self) -> bool:
+        """ True if mapping values are merged across mappings. """
+        return self._children is not None
+
+    @property
+    def version(self) -> int:
+        """ Counter incremented each time the mappings in the chain change.
+
+        :return: current chain version
+        """
+        return self._version
+
+    def _compile(self) -> None:
+        # Flatten mappings into priority order once per change so lookups never need to sort
+        positions: Dict[int, Tuple[int, int]] = {}
+
+        for order in self._orders:
+            for n, m in enumerate(self._maps[order]):
+                positions.setdefault(id(m), (order, n))
+
+        self._positions = positions
+        self._layers = tuple(nested_flatten(self._maps[order] for order in self._orders))
+        self._layers_reversed = self._layers[::-1]
+
+    def _resolve_map(self, k: _K) -> Optional[Mapping[_K, _V]]:
+        for m in self._layers:
+            if k in m:
+                return m
+
+        return None
+
+    def _lookup(self, k: _K) -> Optional[Mapping[_K, _V]]:
+        index = self._index
+
+        if index is not None:
+            return index.get(k)
+
+        cache = self._cache
+
+        if cache is not None:
+            m = cache.get(k)
+
+            if m is None:
+                # Misses are not cached so probing for absent keys cannot grow the cache
+                m = self._resolve_map(k)
+
+                if m is not None:
+                    cache[k] = m
+
+            return m
+
+        return self._resolve_map(k)
+
+    def _find(self, m: TChainLayer[_K, _V]) -> Tuple[int, int, Mapping[_K, _V]]:
+        for order in self._orders:
+            for n, layer in enumerate(self._maps[order]):
+                if layer is m or (isinstance(layer, _LazyMapping) and layer.loader is m):
+                    return order, n, layer
+
+        raise ValueError('Mapping not found in chain')
+
+    def _insert(self, m: Mapping[_K, _V], order: int, append: bool) -> None:
+        try:
+            layers = self._maps[order]
+        except KeyError:
+            layers = self._maps[order] = deque()
+            insort(self._orders, order)
+
+        if append:
+            layers.append(m)
+        else:
+            layers.appendleft(m)
+
+    def _remove(self, m: TChainLayer[_K, _V]) -> Mapping[_K, _V]:
+        order, n, layer = self._find(m)
+        layers = self._maps[order]
+
+        del layers[n]
+
+        if not layers:
+            del self._maps[order]
+            self._orders.remove(order)
+
+        return layer
+
+    def _writable_state(self) -> Tuple[Optional[_TCache[_K, _V]], Optional[_TIndex[_K, _V]],
+                                       Optional[_TChildren[_K, _V]]]:
+        return self._cache, self._index, self._children
+
+    def _changed(self, *maps: Mapping[_K, _V], inserted: bool = False) -> None:
+        self._compile()
+        self._version += 1
+
+        cache, index, children = self._writable_state()
+
+        # Only keys held by changed mappings, or previously supplied by them, can resolve differently
+        keys: Set[_K] = set()
+
+        for m in maps:
+            if index is None and isinstance(m, _LazyMapping) and not m.loaded:
+                # Keys of an unloaded mapping are unknown, so any cached resolution may now be shadowed
+                for state in (cache, children):
+                    if state is not None:
+                        state.clear()
+
+                continue
+
+            keys.update(m.keys())
+
+            if not inserted:
+                for suppliers in (cache, index):
+                    if suppliers is not None:
+                        keys.update(k for k, v in suppliers.items() if v is m)
+
+                if children is not None:
+                    keys.update(k for k, (sources, _) in children.items() if any(x is m for x in sources))
+
+        self._update(keys, cache, index, children, maps if inserted else ())
+        self._cache, self._index, self._children = cache, index, children
+
+    def _update(self, keys: Iterable[_K], cache: Optional[_TCache[_K, _V]], index: Optional[_TIndex[_K, _V]],
+                children: Optional[_TChildren[_K, _V]] = None, inserted: Iterable[Mapping[_K, _V]] = ()) -> None:
+        for state in (cache, children):
+            if state is not None:
+                for k in keys:
+                    state.pop(k, None)
+
+        if index is not None and inserted:
+            positions = self._positions
+
+            # Inserted mappings only need comparing against the current supplier of each of their keys
+            for m in inserted:
+                position = positions[id(m)]
+
+                for k in m.keys():
+                    current = index.get(k)
+
+                    if current is None or position < positions[id(current)]:
+                        index[k] = m
+        elif index is not None:
+            for k in keys:
+                supplier = self._resolve_map(k)
+
+                if supplier is None:
+                    index.pop(k, None)
+                else:
+                    index[k] = supplier
+
+    def _child(self, k: _K) -> 'PriorityChainMap[Any, Any]':
+        children = self._children
+        assert children is not None
+
+        try:
+            return children[k][1]
+        except KeyError:
+            pass
+
+        sources: List[Mapping[_K, _V]] = []
+        sub_maps: List[Mapping[Any, Any]] = []
+
+        for m in self._layers:
+            if k in m:
+                value = m[k]
+
+                # Non-mapping values shadow any mappings in lower priority layers
+                if not isinstance(value, Mapping):
+                    break
+
+                sources.append(m)
+                sub_maps.append(value)
+
+        child = type(self)(indexed=self._index is not None, cached=self._cache is not None, nested=True)
+        child._maps[0] = deque(sub_maps)
+        child._orders.append(0)
+        child._changed(*sub_maps, inserted=True)
+
+        children[k] = (tuple(sources), child)
+
+        return child
+
+    def _value(self, k: _K, value: _V) -> _V:
+        if self._children is not None and isinstance(value, Mapping):
+            return typing.cast(_V, self._child(k))
+
+        return value
+
     def _key_set(self) -> Set[_K]:
         key_set: Set[_K] = set()
 
-        for m in self._map_iterable():
+        for m in self._layers:
             key_set.update(m.keys())
 
         return key_set
 
-    def _map_iterable(self, reverse_order: bool = False, reverse_list: bool = False) -> Iterable[Mapping[_K, _V]]:
-        list_index = -1 if reverse_list else 1
+    @staticmethod
+    def _wrap(m: TChainLayer[_K, _V]) -> Mapping[_K, _V]:
+        if isinstance(m, Mapping):
+            return m
 
-        return nested_flatten(
-            v[::list_index] for k, v in sorted(self._maps.items(), key=lambda p: p[0], reverse=reverse_order)
-        )
+        if not callable(m):
+            raise TypeError(f"Expected mapping or mapping loader, got {type(m).__name__!r}")
 
-    def insert(self, m: Mapping[_K, _V], order: int = 0, append: bool = False) -> None:
+        return _LazyMapping(m)
+
+    def insert(self, m: TChainLayer[_K, _V], order: int = 0, append: bool = False) -> None:
         """ Insert a mapping into the chain at a specified position in the mapping order. If other mappings exist at
         the supplied order index then the new mapping is appended or inserted into the order according to the append
         argument.
 
-        :param m: mapping to add to the chain
+        A zero argument callable returning a mapping may be supplied in place of a mapping, in which case it is only
+        called (once) when a lookup first reaches it. Indexed chains call the loader on insertion.
+
+        :param m: mapping or mapping loader to add to the chain
         :param order: order/priority, lower order mappings are returned over others when duplicate keys exist
         :param append: if True append the mapping to the end of the mapping list for a given order, otherwise insert
         """
-        if append:
-            self._maps[order].append(m)
-        else:
-            self._maps[order].insert(0, m)
+        layer = self._wrap(m)
+        self._insert(layer, order, append)
+        self._changed(layer, inserted=True)
+
+    def remove(self, m: TChainLayer[_K, _V]) -> None:
+        """ Remove a mapping from the chain. Only the keys held by the removed mapping are re-resolved.
+
+        :param m: mapping or mapping loader to remove
+        :raises ValueError: if the mapping is not in the chain
+        """
+        self._changed(self._remove(m))
+
+    def replace(self, old: TChainLayer[_K, _V], new: TChainLayer[_K, _V]) -> None:
+        """ Replace a mapping in the chain with another mapping at the same position.
+
+        :param old: mapping or mapping loader to replace
+        :param new: mapping or mapping loader to insert in place of old mapping
+        :raises ValueError: if the old mapping is not in the chain
+        """
+        order, n, old_layer = self._find(old)
+        new_layer = self._maps[order][n] = self._wrap(new)
+        self._changed(old_layer, new_layer)
+
+    def move(self, m: TChainLayer[_K, _V], order: int, append: bool = False) -> None:
+        """ Move a mapping in the chain to a new position in the mapping order.
+
+        :param m: mapping or mapping loader to move
+        :param order: new order/priority
+        :param append: if True append the mapping to the end of the mapping list for a given order, otherwise insert
+        :raises ValueError: if the mapping is not in the chain
+        """
+        layer = self._remove(m)
+        self._insert(layer, order, append)
+        self._changed(layer)
+
+    def _merge(self) -> Dict[_K, _V]:
+        merged: Dict[_K, _V] = {}
+
+        # Apply mappings from lowest to highest priority so higher priority values overwrite
+        for m in self._layers_reversed:
+            merged.update(m)
+
+        return merged
+
+    def freeze(self) -> Mapping[_K, _V]:
+        """ Get an immutable snapshot of the merged contents of the chain. The snapshot is built in a single pass over
+        the mappings and is reused until the chain is changed by insertion or invalidation, so invalidate() must be
+        called after modifying a mapping in the chain for the change to appear in a new snapshot.
+
+        :return: read-only mapping
+        """
+        version = self._version
+        frozen = self._frozen
+
+        if frozen is None or frozen[0] != version:
+            merged = self._merge()
+
+            if self._children is not None:
+                for k, value in merged.items():
+                    if isinstance(value, Mapping):
+                        merged[k] = typing.cast(_V, self._child(k).freeze())
+
+            frozen = self._frozen = (version, MappingProxyType(merged))
+
+        return frozen[1]
+
+    def resolve(self, k: _K) -> ChainResolution:
+        """ Get the value for a key along with the order and position within that order of the mapping that supplied it.
+
+        :param k: key to resolve
+        :return: ChainResolution
+        :raises KeyError: if the key is not found in any mapping
+        """
+        while True:
+            positions = self._positions
+            m = self._lookup(k)
+
+            if m is None:
+                raise KeyError(f"Key {k!r} not found in any map")
+
+            try:
+                order, n = positions[id(m)]
+            except KeyError:
+                # Chain was changed by another thread during lookup
+                continue
+
+            return ChainResolution(self._value(k, m[k]), order, n)
+
+    def provenance(self) -> Dict[_K, Tuple[int, int]]:
+        """ Get the order and index within that order of the mapping supplying each key in the chain. Built from the
+        index if available, otherwise from a single pass over the mappings.
+
+        :return: dict of keys to order and index tuples
+        """
+        while True:
+            positions = self._positions
+            index = self._index
 
-    def __getitem__(self, __k: _K) -> _V:
-        for m in self._map_iterable():
             try:
-                return m[__k]
+                if index is not None:
+                    return {k: positions[id(m)] for k, m in index.items()}
+
+                report: Dict[_K, Tuple[int, int]] = {}
+
+                # Apply mappings from lowest to highest priority so higher priority positions overwrite
+                for m in self._layers_reversed:
+                    report.update(dict.fromkeys(m.keys(), positions[id(m)]))
+
+                return report
             except KeyError:
+                # Chain was changed by another thread during traversal
                 continue
 
-        raise KeyError(f"Key {__k!r} not found in any map")
+    def get_many(self, keys: Iterable[_K], default: Optional[_V] = None) -> Dict[_K, Optional[_V]]:
+        """ Get the values for several keys at once. Each mapping in the chain is visited at most once and keys are no
+        longer searched for once a mapping supplies them.
+
+        :param keys: keys to retrieve
+        :param default: value returned for keys not found in any mapping
+        :return: dict of requested keys to values
+        """
+        keys = list(keys)
+        index = self._index
+
+        if index is not None:
+            return {k: self._value(k, index[k][k]) if k in index else default for k in keys}
+
+        cache = self._cache
+        resolved: Dict[_K, _V] = {}
+        remaining = set(keys)
+
+        if cache is not None:
+            for k in keys:
+                cached = cache.get(k)
+
+                if cached is not None:
+                    remaining.discard(k)
+                    resolved[k] = cached[k]
+
+        for m in self._layers:
+            if not remaining:
+                break
+
+            found = m.keys() & remaining
+
+            if found:
+                remaining.difference_update(found)
+
+                for k in found:
+                    resolved[k] = m[k]
+
+                    if cache is not None:
+                        cache[k] = m
+
+        return {k: self._value(k, resolved[k]) if k in resolved else default for k in keys}
+
+    def invalidate(self, m: Optional[TChainLayer[_K, _V]] = None) -> None:
+        """ Discard cached and indexed state after a mapping in the chain has been modified.
+
+        :param m: modified mapping or mapping loader, if None state for all mappings is discarded
+        """
+        if m is not None:
+            self._changed(m if isinstance(m, Mapping) else self._find(m)[2])
+            return
+
+        self._version += 1
+
+        if self._cache is not None:
+            self._cache = {}
+
+        if self._children is not None:
+            self._children = {}
+
+        if self._index is not None:
+            index: _TIndex[_K, _V] = {}
+            self._update(self._key_set(), None, index)
+            self._index = index
+
+    def __getitem__(self, __k: _K) -> _V:
+        m = self._lookup(__k)
+
+        if m is None:
+            raise KeyError(f"Key {__k!r} not found in any map")
+
+        return self._value(__k, m[__k])
+
+    def __contains__(self, __k: Any) -> bool:
+        return self._lookup(__k) is not None
 
     def __len__(self) -> int:
+        index = self._index
+
+        if index is not None:
+            return len(index)
+
         return len(self._key_set())
 
     def __iter__(self) -> Iterator[_K]:
+        index = self._index
+
+        if index is not None:
+            return iter(index)
+
         return iter(self._key_set())
 
     def to_dict(self) -> Dict[_K, _V]:
-        return dict(self.items())
+        merged = self._merge()
+
+        if self._children is None:
+            return merged
+
+        return {
+            k: typing.cast(_V, self._child(k).to_dict()) if isinstance(v, Mapping) else v
+            for k, v in merged.items()
+        }
+
+
+class ConcurrentPriorityChainMap(PriorityChainMap[_K, _V]):
+    """ PriorityChainMap that may be shared between threads. Changes to the chain are serialised by a lock and applied
+    to copies of the internal state, which then replace the originals, so lookups never take a lock. """
+
+    def __init__(self, *initial: TChainLayer[_K, _V], indexed: bool = False, cached: bool = False,
+                 nested: bool = False):
+        self._write_lock = Lock()
+
+        super().__init__(*initial, indexed=indexed, cached=cached, nested=nested)
+
+    def _writable_state(self) -> Tuple[Optional[_TCache[_K, _V]], Optional[_TIndex[_K, _V]],
+                                       Optional[_TChildren[_K, _V]]]:
+        cache, index, children = self._cache, self._index, self._children
+
+        return (
+            None if cache is None else cache.copy(),
+            None if index is None else index.copy(),
+            None if children is None else children.copy()
+        )
+
+    def insert(self, m: TChainLayer[_K, _V], order: int = 0, append: bool = False) -> None:
+        with self._write_lock:
+            super().insert(m, order, append)
+
+    def remove(self, m: TChainLayer[_K, _V]) -> None:
+        with self._write_lock:
+            super().remove(m)
+
+    def replace(self, old: TChainLayer[_K, _V], new: TChainLayer[_K, _V]) -> None:
+        with self._write_lock:
+            super().replace(old, new)
+
+    def move(self, m: TChainLayer[_K, _V], order: int, append: bool = False) -> None:
+        with self._write_lock:
+            super().move(m, order, append)
+
+    def invalidate(self, m: Optional[TChainLayer[_K, _V]] = None) -> None:
+        with self._write_lock:
+            super().invalidate(m)
@@ -1,41 +1,134 @@
 # -*- coding: utf-8 -*-
 import collections.abc
+import math
+import os
+import time
 import typing
-from itertools import tee
-from typing import Generator, Iterable, Iterator, Sequence, Tuple, TypeVar
+from collections import OrderedDict, deque
+from datetime import datetime
+from heapq import heapify, heappop, heapreplace
+from itertools import chain, islice, tee
+from queue import Empty, Queue
+from threading import Event, Thread
+from typing import (TYPE_CHECKING, Any, AsyncIterable, AsyncIterator, Callable,
+                    Deque, Dict, Generator, Iterable, Iterator, List, Optional,
+                    Sequence, Set, Tuple, Type, TypeVar, Union, overload)
+
+if TYPE_CHECKING:
+    # Imported when used, asyncio and the executors are slow to import and not needed by most users of this module
+    import asyncio
+    from concurrent.futures import Executor, Future
 
 __all__ = [
+    'register_flatten_leaf',
+    'register_flatten_container',
     'flatten',
     'nested_flatten',
     'chunk',
-    'pair'
+    'chunk_buffer',
+    'pair',
+    'window',
+    'parallel_map',
+    'aflatten',
+    'achunk',
+    'apair',
+    'batch',
+    'abatch',
+    'prefetch',
+    'merge_sorted',
+    'unique'
 ]
 
 
 TItem = TypeVar('TItem')
+TResult = TypeVar('TResult')
+
+
+_FLATTEN_LEAF = 0
+_FLATTEN_STR = 1
+_FLATTEN_CONTAINER = 2
+
+# Classification of types encountered by flatten, populated on first use of each type
+_flatten_types: Dict[type, int] = {}
+
+
+def _flatten_classify(t: type) -> int:
+    if issubclass(t, str):
+        kind = _FLATTEN_STR
+    elif issubclass(t, collections.abc.Iterable):
+        kind = _FLATTEN_CONTAINER
+    else:
+        kind = _FLATTEN_LEAF
+
+    _flatten_types[t] = kind
+
+    return kind
+
+
+def register_flatten_leaf(*types: Type[Any]) -> None:
+    """ Register types that flatten should always return whole, even if they are iterable (eg. bytes).
+
+    :param types: types to register
+    """
+    for t in types:
+        _flatten_types[t] = _FLATTEN_LEAF
+
+
+def register_flatten_container(*types: Type[Any]) -> None:
+    """ Register iterable types that flatten should always iterate.
+
+    :param types: types to register
+    """
+    for t in types:
+        if not issubclass(t, collections.abc.Iterable):
+            raise TypeError(f"Container type {t.__name__!r} is not iterable")
 
+        _flatten_types[t] = _FLATTEN_CONTAINER
 
-def flatten(iterable: Iterable[TItem], flatten_str: bool = False) -> Iterator[TItem]:
+
+def flatten(iterable: Iterable[TItem], flatten_str: bool = False,
+            max_depth: Optional[int] = None) -> Iterator[TItem]:
     """ Flatten an iterable containing iterable sub-objects into a one-dimensional iterator.
 
     :param iterable: input sequence
     :param flatten_str: if True string objects in iterable are iterated, otherwise strings are returned whole
+    :param max_depth: maximum number of levels of nesting to flatten, deeper iterables are returned whole. If None then
+        all levels are flattened
     :return: flattened sequence
     """
-    for item in iterable:
-        if isinstance(item, str):
-            if len(item) == 1:
-                yield typing.cast(TItem, item[0])
-            elif flatten_str:
-                for char in item:
-                    yield typing.cast(TItem, char)
+    # Walk an explicit stack of iterators rather than nesting generators, so items are not passed up through a
+    # generator frame for every level of nesting
+    stack = [iter(iterable)]
+
+    # Classify items by type with a single dict lookup, the ABC check for iterables is only performed once per type
+    types = _flatten_types
+
+    while stack:
+        for item in stack[-1]:
+            kind = types.get(type(item))
+
+            if kind is None:
+                kind = _flatten_classify(type(item))
+
+            if kind == _FLATTEN_LEAF:
+                yield item
+            elif kind == _FLATTEN_STR:
+                text = typing.cast(str, item)
+
+                if len(text) == 1:
+                    yield typing.cast(TItem, text[0])
+                elif flatten_str:
+                    for char in text:
+                        yield typing.cast(TItem, char)
+                else:
+                    yield item
+            elif max_depth is None or len(stack) <= max_depth:
+                stack.append(iter(typing.cast(Iterable[Any], item)))
+                break
             else:
-                yield typing.cast(TItem, item)
-        elif isinstance(item, collections.abc.Iterable):
-            for sub_item in flatten(item, flatten_str):
-                yield sub_item
+                yield item
         else:
-            yield item
+            stack.pop()
 
 
 def nested_flatten(iterable: Iterable[Iterable[TItem]]) -> Generator[TItem, None, None]:
@@ -47,18 +140,85 @@ def nested_flatten(iterable: Iterable[Iterable[TItem]]) -> Generator[TItem, None
     return (item for sublist in iterable for item in sublist)
 
 
-def chunk(data: Sequence[TItem], size: int) -> Generator[Sequence[TItem], None, None]:
-    """ Get iterator to return portions of a sequence in chunks of a maximum size.
+def _is_sliceable(data: Any) -> bool:
+    # Any sized object supporting item access may be sliced (eg. NumPy arrays which are not registered as sequences)
+    return isinstance(data, collections.abc.Sized) and hasattr(type(data), '__getitem__') and \
+        not isinstance(data, collections.abc.Mapping)
 
-    :param data: input sequence
+
+def chunk(data: Iterable[TItem], size: int, reuse_buffer: bool = False) -> Generator[Sequence[TItem], None, None]:
+    """ Get iterator to return portions of a sequence in chunks of a maximum size. Sized objects supporting slicing are
+    sliced, other iterables are consumed one chunk at a time so only a single chunk is held in memory.
+
+    :param data: input sequence or iterable
     :param size: maximum chunk size
+    :param reuse_buffer: if True the same list is reused for every chunk, each chunk must be consumed before requesting
+        the next
+    :return: iterator
+    """
+    if size <= 0:
+        raise ValueError('Chunk size must be greater than zero')
+
+    if _is_sliceable(data) and not reuse_buffer:
+        sliceable = typing.cast(Sequence[TItem], data)
+        length = len(sliceable)
+
+        if length == 0:
+            return
+
+        try:
+            block = sliceable[0:size]
+        except TypeError:
+            # Item access does not support slices (eg. deque), consume as an iterable instead
+            pass
+        else:
+            yield block
+
+            for n in range(size, length, size):
+                yield sliceable[n:n + size]
+
+            return
+
+    iterator = iter(data)
+
+    if reuse_buffer:
+        buffer: List[TItem] = []
+
+        while True:
+            buffer.clear()
+            buffer.extend(islice(iterator, size))
+
+            if not buffer:
+                return
+
+            yield buffer
+    else:
+        while True:
+            block = list(islice(iterator, size))
+
+            if not block:
+                return
+
+            yield block
+
+
+def chunk_buffer(data: Any, size: int) -> Generator[memoryview, None, None]:
+    """ Get iterator to return portions of an object supporting the buffer protocol (eg. bytes, bytearray, array or
+    memoryview) in chunks of a maximum size. Chunks are memoryview slices sharing memory with the input, no data is
+    copied.
+
+    :param data: input buffer
+    :param size: maximum chunk size in items
     :return: iterator
+    :raises TypeError: if the input does not support the buffer protocol
     """
     if size <= 0:
         raise ValueError('Chunk size must be greater than zero')
 
-    for n in range(0, len(data), size):
-        yield data[n:n + size]
+    view = memoryview(data)
+
+    for n in range(0, len(view), size):
+        yield view[n:n + size]
 
 
 def pair(data: Iterable[TItem]) -> Iterator[Tuple[TItem, TItem]]:
@@ -72,3 +232,647 @@ def pair(data: Iterable[TItem]) -> Iterator[Tuple[TItem, TItem]]:
     iter_a, iter_b = tee(data)
     next(iter_b, None)
     return zip(iter_a, iter_b)
+
+
+class _WindowView(Sequence[TItem]):
+    """ Read-only view of the current contents of a sliding window. """
+
+    def __init__(self, buffer: Deque[TItem]):
+        self._buffer = buffer
+
+    @overload
+    def __getitem__(self, index: int) -> TItem:
+        pass
+
+    @overload
+    def __getitem__(self, index: slice) -> Sequence[TItem]:
+        pass
+
+    def __getitem__(self, index: Any) -> Any:
+        if isinstance(index, slice):
+            return tuple(self._buffer)[index]
+
+        return self._buffer[index]
+
+    def __len__(self) -> int:
+        return len(self._buffer)
+
+    def __iter__(self) -> Iterator[TItem]:
+        return iter(self._buffer)
+
+    def __repr__(self) -> str:
+        return f"{type(self).__name__}({list(self._buffer)!r})"
+
+
+def window(data: Iterable[TItem], size: int, step: int = 1, view: bool = False) -> Iterator[Sequence[TItem]]:
+    """ Get iterator to return overlapping windows of elements from an iterable. Only complete windows are returned.
+
+    :param data: input iterator
+    :param size: number of elements in each window
+    :param step: number of elements to advance between windows
+    :param view: if True return a read-only view of a shared buffer instead of a new tuple for each window, the view is
+        only valid until the next window is requested
+    :return: iterator
+    """
+    if size <= 0:
+        raise ValueError('Window size must be greater than zero')
+
+    if step <= 0:
+        raise ValueError('Window step must be greater than zero')
+
+    iterator = iter(data)
+    buffer: Deque[TItem] = deque(islice(iterator, size), maxlen=size)
+
+    if len(buffer) < size:
+        return
+
+    advance = min(step, size)
+    skip = step - advance
+    append = buffer.append
+    buffer_view = _WindowView(buffer)
+
+    while True:
+        yield buffer_view if view else tuple(buffer)
+
+        if skip > 0:
+            # Discard elements between non-overlapping windows
+            deque(islice(iterator, skip), maxlen=0)
+
+        count = 0
+
+        for item in islice(iterator, advance):
+            append(item)
+            count += 1
+
+        if count < advance:
+            return
+
+
+def _map_chunk(func: Callable[[TItem], TResult], block: Sequence[TItem]) -> List[TResult]:
+    return [func(item) for item in block]
+
+
+def parallel_map(func: Callable[[TItem], TResult], data: Iterable[TItem], chunk_size: int,
+                 executor: Union[str, 'Executor'] = 'thread', ordered: bool = True, max_in_flight: Optional[int] = None,
+                 max_workers: Optional[int] = None) -> Iterator[TResult]:
+    """ Apply a function to each element of an iterable using a pool of threads or processes. Elements are submitted in
+    chunks and only a limited number of chunks are submitted at once, so unbounded iterables can be processed while
+    results are consumed.
+
+    :param func: function to apply, must be picklable when using processes
+    :param data: input iterable
+    :param chunk_size: number of elements submitted to the pool per task
+    :param executor: 'thread' or 'process' to create a pool for the duration of the iteration, or an existing Executor
+    :param ordered: if True results are returned in the order of the input, otherwise results are returned as each
+        chunk completes
+    :param max_in_flight: maximum number of chunks submitted but not yet returned, defaults to twice the number of
+        workers
+    :param max_workers: number of workers when creating a pool, defaults to the number of CPUs
+    :return: iterator of results
+    """
+    if max_workers is None:
+        max_workers = os.cpu_count() or 1
+
+    if max_in_flight is None:
+        max_in_flight = 2 * max_workers
+    elif max_in_flight <= 0:
+        raise ValueError('Maximum chunks in flight must be greater than zero')
+
+    from concurrent.futures import (FIRST_COMPLETED, Executor,
+                                    ProcessPoolExecutor, ThreadPoolExecutor,
+                                    wait)
+
+    if isinstance(executor, Executor):
+        pool = executor
+    elif executor == 'thread':
+        pool = ThreadPoolExecutor(max_workers)
+    elif executor == 'process':
+        pool = ProcessPoolExecutor(max_workers)
+    else:
+        raise ValueError(f"Unknown executor type {executor!r}")
+
+    pending: Union[Deque[Future], Set[Future]] = deque() if ordered else set()
+
+    try:
+        for block in chunk(data, chunk_size):
+            future = pool.submit(_map_chunk, func, block)
+
+            if isinstance(pending, deque):
+                pending.append(future)
+
+                if len(pending) >= max_in_flight:
+                    yield from pending.popleft().result()
+            else:
+                pending.add(future)
+
+                if len(pending) >= max_in_flight:
+                    done, pending = wait(pending, return_when=FIRST_COMPLETED)
+
+                    for future in done:
+                        yield from future.result()
+
+        while pending:
+            if isinstance(pending, deque):
+                yield from pending.popleft().result()
+            else:
+                done, pending = wait(pending, return_when=FIRST_COMPLETED)
+
+                for future in done:
+                    yield from future.result()
+    finally:
+        # Stop outstanding work if the consumer stops early or a task fails
+        for future in pending:
+            future.cancel()
+
+        if pool is not executor:
+            pool.shutdown()
+
+
+async def aflatten(iterable: AsyncIterable[TItem], flatten_str: bool = False,
+                   max_depth: Optional[int] = None) -> AsyncIterator[TItem]:
+    """ Flatten an asynchronous iterable containing iterable or asynchronous iterable sub-objects into a one-dimensional
+    asynchronous iterator.
+
+    :param iterable: input asynchronous iterable
+    :param flatten_str: if True string objects in iterable are iterated, otherwise strings are returned whole
+    :param max_depth: maximum number of levels of nesting to flatten, deeper iterables are returned whole. If None then
+        all levels are flattened
+    :return: flattened asynchronous iterator
+    """
+    async for item in iterable:
+        if isinstance(item, collections.abc.AsyncIterable) and (max_depth is None or max_depth > 0):
+            async for sub_item in aflatten(item, flatten_str, None if max_depth is None else max_depth - 1):
+                yield sub_item
+        else:
+            for sub_item in flatten((item,), flatten_str, max_depth):
+                yield sub_item
+
+
+async def achunk(data: AsyncIterable[TItem], size: int, timeout: Optional[float] = None) -> AsyncIterator[List[TItem]]:
+    """ Get asynchronous iterator to return portions of an asynchronous iterable in chunks of a maximum size.
+
+    :param data: input asynchronous iterable
+    :param size: maximum chunk size
+    :param timeout: if provided, maximum time in seconds to wait after the first element of a chunk is received before
+        returning a partial chunk
+    :return: asynchronous iterator
+    """
+    if size <= 0:
+        raise ValueError('Chunk size must be greater than zero')
+
+    if timeout is None:
+        block: List[TItem] = []
+
+        async for item in data:
+            block.append(item)
+
+            if len(block) >= size:
+                yield block
+                block = []
+
+        if block:
+            yield block
+
+        return
+
+    import asyncio
+
+    loop = asyncio.get_running_loop()
+    iterator = data.__aiter__()
+    block = []
+    deadline = 0.0
+
+    # Request for the next element is kept between timeouts, cancelling it would also cancel the source
+    next_item: Optional[asyncio.Future] = None
+
+    try:
+        while True:
+            if next_item is None:
+                next_item = asyncio.ensure_future(iterator.__anext__())
+
+            if block:
+                done, _ = await asyncio.wait((next_item,), timeout=max(deadline - loop.time(), 0))
+
+                if not done:
+                    yield block
+                    block = []
+                    continue
+            else:
+                await asyncio.wait((next_item,))
+
+            try:
+                item = next_item.result()
+            except StopAsyncIteration:
+                break
+            finally:
+                next_item = None
+
+            if not block:
+                deadline = loop.time() + timeout
+
+            block.append(item)
+
+            if len(block) >= size:
+                yield block
+                block = []
+    finally:
+        if next_item is not None:
+            next_item.cancel()
+
+    if block:
+        yield block
+
+
+async def apair(data: AsyncIterable[TItem]) -> AsyncIterator[Tuple[TItem, TItem]]:
+    """ Get asynchronous iterator to return pairs of elements from an asynchronous iterable.
+
+    :param data: input asynchronous iterable
+    :return: asynchronous iterator
+    """
+    iterator = data.__aiter__()
+
+    try:
+        previous = await iterator.__anext__()
+    except StopAsyncIteration:
+        return
+
+    async for item in iterator:
+        yield previous, item
+        previous = item
+
+
+_READER_END = object()
+
+
+class _ReaderError:
+    def __init__(self, exc: BaseException):
+        self.exc = exc
+
+
+class _ReaderThread(Thread):
+    """ Background thread reading elements from an iterable into a bounded queue. """
+
+    def __init__(self, data: Iterable[Any], depth: int):
+        super().__init__(daemon=True)
+
+        self._data = data
+        self._queue: 'Queue[Any]' = Queue(depth)
+        self._stop_event = Event()
+
+    def run(self) -> None:
+        iterator = iter(self._data)
+
+        try:
+            for item in iterator:
+                self._queue.put(item)
+
+                if self._stop_event.is_set():
+                    return
+        except BaseException as exc:
+            self._queue.put(_ReaderError(exc))
+        else:
+            self._queue.put(_READER_END)
+        finally:
+            # Release resources held by generators when stopped early
+            close = getattr(iterator, 'close', None)
+
+            if close is not None:
+                close()
+
+    def get(self, timeout: Optional[float] = None) -> Any:
+        """ Get the next element read from the iterable, or _READER_END once exhausted.
+
+        :param timeout: maximum time to wait in seconds, if None wait indefinitely
+        :return: element
+        :raises queue.Empty: if no element is available before the timeout
+        """
+        item = self._queue.get(timeout=timeout)
+
+        if isinstance(item, _ReaderError):
+            raise item.exc
+
+        return item
+
+    def stop(self) -> None:
+        """ Request the reader stop. The thread exits once the current element has been read from the iterable. """
+        self._stop_event.set()
+
+        # Free space in the queue so a blocked reader can observe the request
+        try:
+            while True:
+                self._queue.get_nowait()
+        except Empty:
+            pass
+
+
+def batch(data: Iterable[TItem], max_size: int, max_latency: float) -> Iterator[List[TItem]]:
+    """ Get iterator to return batches of elements from an iterable, returning a batch once it reaches a maximum size or
+    a maximum time has elapsed since its first element was received. Elements are read by a background thread so
+    blocking iterables do not delay partial batches.
+
+    :param data: input iterable
+    :param max_size: maximum batch size
+    :param max_latency: maximum time in seconds between receiving the first element of a batch and returning the batch
+    :return: iterator
+    """
+    if max_size <= 0:
+        raise ValueError('Batch size must be greater than zero')
+
+    reader = _ReaderThread(data, max_size)
+    reader.start()
+
+    try:
+        while True:
+            item = reader.get()
+
+            if item is _READER_END:
+                return
+
+            block = [item]
+            deadline = time.monotonic() + max_latency
+
+            while len(block) < max_size:
+                remaining = deadline - time.monotonic()
+
+                if remaining <= 0:
+                    break
+
+                try:
+                    item = reader.get(remaining)
+                except Empty:
+                    break
+                except Exception:
+                    # Return elements read before the failure
+                    yield block
+                    raise
+
+                if item is _READER_END:
+                    yield block
+                    return
+
+                block.append(item)
+
+            yield block
+    finally:
+        reader.stop()
+
+
+def abatch(data: AsyncIterable[TItem], max_size: int, max_latency: float) -> AsyncIterator[List[TItem]]:
+    """ Get asynchronous iterator to return batches of elements from an asynchronous iterable, returning a batch once it
+    reaches a maximum size or a maximum time has elapsed since its first element was received.
+
+    :param data: input asynchronous iterable
+    :param max_size: maximum batch size
+    :param max_latency: maximum time in seconds between receiving the first element of a batch and returning the batch
+    :return: asynchronous iterator
+    """
+    return achunk(data, max_size, max_latency)
+
+
+def prefetch(data: Iterable[TItem], depth: int = 8) -> Iterator[TItem]:
+    """ Get iterator that reads ahead from an iterable in a background thread, allowing a slow producer to run while the
+    consumer processes earlier elements. Exceptions raised by the iterable are raised in the consumer.
+
+    :param data: input iterable
+    :param depth: maximum number of elements read ahead
+    :return: iterator
+    """
+    if depth <= 0:
+        raise ValueError('Prefetch depth must be greater than zero')
+
+    reader = _ReaderThread(data, depth)
+    reader.start()
+
+    try:
+        while True:
+            item = reader.get()
+
+            if item is _READER_END:
+                return
+
+            yield item
+    finally:
+        reader.stop()
+
+
+def _datetime_microseconds(t: datetime) -> int:
+    try:
+        offset = t.utcoffset()
+    except AttributeError:
+        raise TypeError(f"Can't compare {type(t).__name__!r} with timezone aware datetime") from None
+
+    if offset is None:
+        # Comparing directly would fail, so naive datetimes after the first elements must not be treated as UTC
+        raise TypeError("Can't compare offset-naive and offset-aware datetimes")
+
+    t = t - offset
+
+    return ((t.toordinal() * 86400 + t.hour * 3600 + t.minute * 60 + t.second) * 1000000) + t.microsecond
+
+
+def merge_sorted(*iterables: Iterable[TItem], key: Optional[Callable[[TItem], Any]] = None) -> Iterator[TItem]:
+    """ Merge several sorted iterables into a single sorted iterator. Only the current element of each iterable is held
+    in memory. Elements with equal keys are returned in the order of the iterables they came from.
+
+    Timezone aware datetime keys with differing tzinfo objects (eg. local times from localtime.parse_datetime) are
+    converted to integer microseconds once per element, as comparing them directly requires UTC offset calculations.
+    As with direct comparison a TypeError is raised if a later key is not a timezone aware datetime.
+
+    :param iterables: sorted input iterables
+    :param key: function to extract comparison key from each element, if None elements are compared directly
+    :return: iterator
+    """
+    # Heap entries of [key, iterable position, item, iterator], position keeps equal keys stable and avoids comparing
+    # items. Keys of the first elements are computed once, both to choose the key conversion and to build the heap
+    entries: List[List[Any]] = []
+
+    for order, iterable in enumerate(iterables):
+        iterator = iter(iterable)
+
+        for item in iterator:
+            entries.append([item if key is None else key(item), order, item, iterator])
+            break
+
+    merge_key: Optional[Callable[[Any], Any]] = key
+
+    if len(entries) > 1 and all(isinstance(entry[0], datetime) and entry[0].tzinfo is not None for entry in entries) \
+            and any(entry[0].tzinfo is not entries[0][0].tzinfo for entry in entries):
+        if key is None:
+            merge_key = _datetime_microseconds
+        else:
+            item_key = key
+
+            def datetime_key(item: TItem) -> int:
+                return _datetime_microseconds(item_key(item))
+
+            merge_key = datetime_key
+
+        for entry in entries:
+            entry[0] = _datetime_microseconds(entry[0])
+
+    heapify(entries)
+
+    if merge_key is None:
+        while len(entries) > 1:
+            entry = entries[0]
+
+            yield entry[2]
+
+            for item in entry[3]:
+                entry[0] = entry[2] = item
+                heapreplace(entries, entry)
+                break
+            else:
+                heappop(entries)
+    else:
+        while len(entries) > 1:
+            entry = entries[0]
+
+            yield entry[2]
+
+            for item in entry[3]:
+                entry[0] = merge_key(item)
+                entry[2] = item
+                heapreplace(entries, entry)
+                break
+            else:
+                heappop(entries)
+
+    if entries:
+        # Remaining iterable needs no comparisons
+        yield entries[0][2]
+        yield from entries[0][3]
+
+
+class _BloomFilter:
+    """ Fixed capacity Bloom filter over Python object hashes. """
+
+    def __init__(self, capacity: int, error_rate: float):
+        size = max(8, math.ceil(-capacity * math.log(error_rate) / (math.log(2) ** 2)))
+
+        self._size = size
+        self._hash_count = max(1, round(size / capacity * math.log(2)))
+        self._bits = bytearray((size + 7) // 8)
+
+    def _hash(self, item: Any) -> Tuple[int, int]:
+        # Mix the object hash (splitmix64 finaliser) as hashes of small integers are the integers themselves
+        h = hash(item) & 0xFFFFFFFFFFFFFFFF
+        h = ((h ^ (h >> 30)) * 0xBF58476D1CE4E5B9) & 0xFFFFFFFFFFFFFFFF
+        h = ((h ^ (h >> 27)) * 0x94D049BB133111EB) & 0xFFFFFFFFFFFFFFFF
+        h ^= h >> 31
+
+        # Positions are generated by double hashing
+        return (h & 0xFFFFFFFF) % self._size, ((h >> 32) | 1) % self._size
+
+    def add(self, item: Any) -> bool:
+        """ Add an item to the filter.
+
+        :param item: hashable item
+        :return: True if the item may already have been added, False if it definitely was not
+        """
+        bits = self._bits
+        size = self._size
+        position, step = self._hash(item)
+        present = True
+
+        for _ in range(self._hash_count):
+            byte = bits[position >> 3]
+            mask = 1 << (position & 7)
+
+            if not byte & mask:
+                bits[position >> 3] = byte | mask
+                present = False
+
+            position += step
+
+            if position >= size:
+                position -= size
+
+        return present
+
+    def __contains__(self, item: Any) -> bool:
+        bits = self._bits
+        size = self._size
+        position, step = self._hash(item)
+
+        for _ in range(self._hash_count):
+            if not bits[position >> 3] & (1 << (position & 7)):
+                return False
+
+            position += step
+
+            if position >= size:
+                position -= size
+
+        return True
+
+
+def unique(data: Iterable[TItem], key: Optional[Callable[[TItem], Any]] = None, max_items: Optional[int] = None,
+           error_rate: Optional[float] = None) -> Iterator[TItem]:
+    """ Get iterator returning elements of an iterable with duplicates removed, preserving the order of first
+    occurrence.
+
+    By default every key seen is remembered. If max_items is provided only the most recently seen keys are remembered,
+    so duplicates further apart than max_items unique keys are not removed. If error_rate is also provided keys are
+    tracked approximately with Bloom filters, using far less memory at the cost of unique elements being dropped at
+    approximately error_rate. Two filters of max_items keys are kept, the oldest is discarded when the newest is full.
+
+    :param data: input iterable
+    :param key: function to extract the key used to identify duplicates, if None elements are used directly
+    :param max_items: maximum number of keys to remember, if None all keys are remembered
+    :param error_rate: if provided track keys approximately with this false positive rate
+    :return: iterator
+    """
+    if max_items is not None and max_items <= 0:
+        raise ValueError('Maximum items must be greater than zero')
+
+    if error_rate is not None:
+        if max_items is None:
+            raise ValueError('Maximum items required for approximate de-duplication')
+
+        if not 0 < error_rate < 1:
+            raise ValueError('Error rate must be between 0 and 1')
+
+        previous: Optional[_BloomFilter] = None
+        current = _BloomFilter(max_items, error_rate)
+        count = 0
+
+        for item in data:
+            k = item if key is None else key(item)
+
+            if current.add(k):
+                continue
+
+            count += 1
+
+            if previous is None or k not in previous:
+                yield item
+
+            if count >= max_items:
+                previous, current = current, _BloomFilter(max_items, error_rate)
+                count = 0
+    elif max_items is not None:
+        recent: 'OrderedDict[Any, None]' = OrderedDict()
+
+        for item in data:
+            k = item if key is None else key(item)
+
+            if k in recent:
+                recent.move_to_end(k)
+                continue
+
+            recent[k] = None
+
+            if len(recent) > max_items:
+                recent.popitem(last=False)
+
+            yield item
+    else:
+        seen: Set[Any] = set()
+
+        for item in data:
+            k = item if key is None else key(item)
+
+            if k not in seen:
+                seen.add(k)
+                yield item
@@ -1,22 +1,37 @@
 # -*- coding: utf-8 -*-
+import math
+import operator
 import re
+import typing
 from datetime import datetime, timedelta, timezone
-from typing import Union
+from threading import local
+from typing import (TYPE_CHECKING, Any, Callable, Dict, FrozenSet, Iterable,
+                    Iterator, List, Match, Optional, Tuple, TypeVar, Union)
 
 from plenary import constant
 
+if TYPE_CHECKING:
+    # NumPy is optional and imported when used, it is slow to import and most uses of this module only parse arguments
+    import numpy
+
 __all__ = [
     'datetime',
     'timedelta',
     'timezone',
     'now',
+    'DateTimeParser',
     'parse_datetime',
-    'time_round'
+    'parse_datetimes',
+    'parse_timestamp_ns',
+    'time_round',
+    'resample'
 ]
 
 
 TParseDateTime = Union[int, float, str, datetime]
 
+TSample = TypeVar('TSample')
+
 
 _DATETIME_FORMATS = [
     constant.FORMAT_TIMESTAMP_CONSOLE,
@@ -26,7 +41,20 @@ _DATETIME_FORMATS = [
 ]
 
 
-_REGEX_TIMESTAMP = re.compile(r'^(\d+\.?\d*)([smun]?)$')
+_REGEX_TIMESTAMP = re.compile(r'^(\d+(?:\.\d*)?)([smun]?)$')
+
+# Decimal digits per unit to get nanoseconds for timestamp suffixes
+_TIMESTAMP_DIGITS = {
+    '': 9,
+    's': 9,
+    'm': 6,
+    'u': 3,
+    'n': 0
+}
+
+_EPOCH_UTC = datetime(1970, 1, 1, tzinfo=timezone.utc)
+_EPOCH_ORDINAL = _EPOCH_UTC.toordinal()
+_MICROSECOND = timedelta(microseconds=1)
 
 
 def now(as_local: bool = True) -> datetime:
@@ -47,55 +75,419 @@ class DateTimeParseError(ValueError):
     pass
 
 
-def parse_datetime(value: TParseDateTime, numeric_utc: bool = True) -> datetime:
-    """ Date/time or timestamp parser for use with argparse.
+# Regular expressions for supported strptime directives, equivalent to those used by the strptime implementation
+_FORMAT_DIRECTIVES = {
+    'Y': r'(?P<Y>\d\d\d\d)',
+    'y': r'(?P<y>\d\d)',
+    'm': r'(?P<m>1[0-2]|0[1-9]|[1-9])',
+    'd': r'(?P<d>3[01]|[12]\d|0[1-9]|[1-9]| [1-9])',
+    'H': r'(?P<H>2[0-3]|[0-1]\d|\d)',
+    'M': r'(?P<M>[0-5]\d|\d)',
+    'S': r'(?P<S>6[0-1]|[0-5]\d|\d)',
+    'f': r'(?P<f>[0-9]{1,6})'
+}
 
-    :param value: input
-    :param numeric_utc: if True treat numeric values as UTC based, otherwise assume local
-    :return: datetime
-    :raises ValueError: on invalid input
+
+def _compile_format(datetime_format: str) -> Callable[[str], datetime]:
+    """ Compile a strptime format into a regex based parser. Formats using directives without a regex equivalent fall
+    back to strptime.
+
+    :param datetime_format: strptime format
+    :return: parser callable, raises ValueError if the value does not match
     """
-    if isinstance(value, datetime):
-        # Already a datetime
-        return value
-
-    if isinstance(value, int) or isinstance(value, float):
-        # Parse from timestamp
-        if numeric_utc:
-            return datetime.utcfromtimestamp(value).replace(tzinfo=timezone.utc)
+    pattern: List[str] = []
+    fields: List[str] = []
+    n = 0
+
+    while n < len(datetime_format):
+        c = datetime_format[n]
+
+        if c == '%':
+            directive = datetime_format[n + 1:n + 2]
+
+            if directive == '%':
+                pattern.append('%')
+            elif directive in _FORMAT_DIRECTIVES and directive not in fields:
+                pattern.append(_FORMAT_DIRECTIVES[directive])
+                fields.append(directive)
+            else:
+                return lambda v: datetime.strptime(v, datetime_format)
+
+            n += 2
+        elif c.isspace():
+            # Any amount of whitespace matches, as with strptime
+            pattern.append(r'\s+')
+
+            while n < len(datetime_format) and datetime_format[n].isspace():
+                n += 1
         else:
-            return datetime.fromtimestamp(value).astimezone()
+            pattern.append(re.escape(c))
+            n += 1
 
-    timestamp_match = _REGEX_TIMESTAMP.match(value.lower())
+    regex = re.compile(''.join(pattern), re.IGNORECASE)
 
-    if timestamp_match is not None:
-        timestamp = float(timestamp_match[1])
+    def parse(value: str) -> datetime:
+        match = regex.fullmatch(value)
 
-        if timestamp_match[2] == 'm':
-            timestamp /= 1e3
-        elif timestamp_match[2] == 'u':
-            timestamp /= 1e6
-        elif timestamp_match[2] == 'n':
-            timestamp /= 1e9
+        if match is None:
+            raise ValueError(f"Value {value!r} does not match format {datetime_format!r}")
 
-        if numeric_utc:
-            return datetime.utcfromtimestamp(timestamp).replace(tzinfo=timezone.utc)
+        groups = match.groupdict()
+
+        if 'Y' in groups:
+            year = int(groups['Y'])
+        elif 'y' in groups:
+            year = int(groups['y'])
+            year += 2000 if year < 69 else 1900
         else:
-            return datetime.fromtimestamp(timestamp).astimezone()
-    else:
+            year = 1900
+
+        return datetime(
+            year,
+            int(groups.get('m', 1)),
+            int(groups.get('d', 1)),
+            int(groups.get('H', 0)),
+            int(groups.get('M', 0)),
+            int(groups.get('S', 0)),
+            int(groups['f'].ljust(6, '0')) if 'f' in groups else 0
+        )
+
+    return parse
+
+
+_DIGITS = frozenset('0123456789')
+_WHITESPACE = frozenset(' \t\n\r\f\v')
+
+# Characters and minimum and maximum length matched by each regex in _FORMAT_DIRECTIVES
+_FORMAT_DIRECTIVE_SLOTS = {
+    'Y': (_DIGITS, 4, 4),
+    'y': (_DIGITS, 2, 2),
+    'm': (_DIGITS, 1, 2),
+    'd': (_DIGITS | {' '}, 1, 2),
+    'H': (_DIGITS, 1, 2),
+    'M': (_DIGITS, 1, 2),
+    'S': (_DIGITS, 1, 2),
+    'f': (_DIGITS, 1, 6)
+}
+
+_SLOT_REQUIRED = 0
+_SLOT_OPTIONAL = 1
+_SLOT_REPEATED = 2
+
+TFormatSlot = Tuple[FrozenSet[str], int]
+
+
+def _format_slots(datetime_format: str) -> Optional[List[TFormatSlot]]:
+    """ Describe the strings a compiled format can match as a sequence of character slots, each required, optional or
+    repeated any number of times. Slots over-approximate the format, eg. any two digits are accepted for a month.
+
+    :param datetime_format: strptime format
+    :return: list of slots, None if the format is not compiled to a regex
+    """
+    slots: List[TFormatSlot] = []
+    fields: List[str] = []
+    n = 0
+
+    while n < len(datetime_format):
+        c = datetime_format[n]
+
+        if c == '%':
+            directive = datetime_format[n + 1:n + 2]
+
+            if directive == '%':
+                slots.append((frozenset('%'), _SLOT_REQUIRED))
+            elif directive in _FORMAT_DIRECTIVE_SLOTS and directive not in fields:
+                chars, min_length, max_length = _FORMAT_DIRECTIVE_SLOTS[directive]
+                slots.extend([(chars, _SLOT_REQUIRED)] * min_length)
+                slots.extend([(chars, _SLOT_OPTIONAL)] * (max_length - min_length))
+                fields.append(directive)
+            else:
+                return None
+
+            n += 2
+        elif c.isspace():
+            slots.append((_WHITESPACE, _SLOT_REQUIRED))
+            slots.append((_WHITESPACE, _SLOT_REPEATED))
+
+            while n < len(datetime_format) and datetime_format[n].isspace():
+                n += 1
+        else:
+            slots.append((frozenset((c.lower(), c.upper())), _SLOT_REQUIRED))
+            n += 1
+
+    return slots
+
+
+def _formats_overlap(a: Optional[List[TFormatSlot]], b: Optional[List[TFormatSlot]]) -> bool:
+    """ Check if any string could be matched by two formats, by searching for a path through both slot sequences that
+    consumes the same characters. Formats without slots are assumed to overlap with any format.
+
+    :param a: slots of first format
+    :param b: slots of second format
+    :return: True if the formats may match the same string
+    """
+    if a is None or b is None:
+        return True
+
+    end = (len(a), len(b))
+    pending = [(0, 0)]
+    visited = set(pending)
+
+    while pending:
+        i, j = pending.pop()
+
+        if (i, j) == end:
+            return True
+
+        following = []
+
+        # Skip optional or repeated slots in either format
+        if i < len(a) and a[i][1] != _SLOT_REQUIRED:
+            following.append((i + 1, j))
+
+        if j < len(b) and b[j][1] != _SLOT_REQUIRED:
+            following.append((i, j + 1))
+
+        # Consume a character accepted by both formats, repeated slots may consume again
+        if i < len(a) and j < len(b) and a[i][0] & b[j][0]:
+            following.append((i if a[i][1] == _SLOT_REPEATED else i + 1, j if b[j][1] == _SLOT_REPEATED else j + 1))
+
+        for state in following:
+            if state not in visited:
+                visited.add(state)
+                pending.append(state)
+
+    return False
+
+
+class DateTimeParser:
+    """ Date/time or timestamp parser with compiled formats.
+
+    Formats are compiled to regular expressions, avoiding strptime for common directives. The most recently matched
+    format is tried first, so repeatedly parsing values of the same format does not test every format in turn. The
+    most recent match is remembered per thread, so threads parsing different formats do not displace each other.
+    """
+
+    def __init__(self, formats: Optional[Iterable[str]] = None, numeric_utc: bool = True):
+        """ Date/time or timestamp parser with compiled formats.
+
+        :param formats: strptime formats tried after ISO format, defaults to console and filename timestamp formats
+        :param numeric_utc: if True treat numeric values as UTC based, otherwise assume local
+        """
+        self._formats = list(_DATETIME_FORMATS if formats is None else formats)
+        self._numeric_utc = numeric_utc
+
+        self._parsers: List[Callable[[str], datetime]] = [datetime.fromisoformat]
+        self._parsers.extend(_compile_format(datetime_format) for datetime_format in self._formats)
+
+        # Earlier parsers able to match the same strings as each parser, ISO format is assumed to overlap any format
+        slots = [None] + [_format_slots(datetime_format) for datetime_format in self._formats]
+        self._preceding = [
+            tuple(n for n in range(index) if _formats_overlap(slots[n], slots[index])) for index in range(len(slots))
+        ]
+
+        self._local = local()
+
+    @property
+    def formats(self) -> List[str]:
+        return list(self._formats)
+
+    @property
+    def numeric_utc(self) -> bool:
+        return self._numeric_utc
+
+    @property
+    def matched_format(self) -> Optional[str]:
+        """ Format most recently matched in the current thread.
+
+        :return: strptime format, None if no format has been matched or the value was in ISO format
+        """
+        index = getattr(self._local, 'last', 0)
+
+        return self._formats[index - 1] if index > 0 else None
+
+    def __call__(self, value: TParseDateTime) -> datetime:
+        """ Parse date/time or timestamp.
+
+        :param value: input
+        :return: datetime
+        :raises ValueError: on invalid input
+        """
+        if isinstance(value, datetime):
+            # Already a datetime
+            return value
+
+        if isinstance(value, int) or isinstance(value, float):
+            # Parse from timestamp, timedelta rounds fractional seconds to the nearest microsecond
+            return self._from_timestamp(value, seconds=value)
+
+        timestamp_match = _REGEX_TIMESTAMP.match(value.lower())
+
+        if timestamp_match is not None:
+            # Round to the nearest microsecond, ties to even
+            t_us, remainder = divmod(_timestamp_ns(timestamp_match), 1000)
+
+            if remainder > 500 or (remainder == 500 and t_us % 2):
+                t_us += 1
+
+            return self._from_timestamp(value, microseconds=t_us)
+
+        return self._parse_format(value)
+
+    def timestamp_ns(self, value: TParseDateTime) -> int:
+        """ Parse date/time or timestamp as integer nanoseconds since the epoch. Timestamp strings are parsed using
+        integer arithmetic only so nanosecond precision is retained. Naive date/times are treated as UTC.
+
+        :param value: input
+        :return: nanoseconds since the epoch
+        :raises ValueError: on invalid input
+        """
+        if isinstance(value, int):
+            return value * 1000000000
+
+        if isinstance(value, float):
+            try:
+                t_s = math.floor(value)
+            except (OverflowError, ValueError):
+                raise DateTimeParseError(f"Provided value {value!r} is not a finite timestamp") from None
+
+            return t_s * 1000000000 + round((value - t_s) * 1e9)
+
+        if not isinstance(value, datetime):
+            timestamp_match = _REGEX_TIMESTAMP.match(value.lower())
+
+            if timestamp_match is not None:
+                return _timestamp_ns(timestamp_match)
+
+            value = self._parse_format(value)
+
+        if value.tzinfo is None:
+            value = value.replace(tzinfo=timezone.utc)
+
+        return (value - _EPOCH_UTC) // _MICROSECOND * 1000
+
+    def _parse_format(self, value: str) -> datetime:
+        parsers = self._parsers
+        last = getattr(self._local, 'last', 0)
+
+        # Try the last matched format first
         try:
-            # Try ISO format first
-            return datetime.fromisoformat(value)
+            result = parsers[last](value)
         except ValueError:
-            for datetime_format in _DATETIME_FORMATS:
+            pass
+        else:
+            # Earlier formats take precedence, only those able to match the same strings need to be tried
+            for index in self._preceding[last]:
                 try:
-                    # Try other formats
-                    return datetime.strptime(value, datetime_format)
+                    result = parsers[index](value)
                 except ValueError:
-                    pass
+                    continue
+
+                self._local.last = index
+
+                break
+
+            return result
+
+        for index, parser in enumerate(parsers):
+            if index == last:
+                continue
+
+            try:
+                result = parser(value)
+            except ValueError:
+                continue
+
+            self._local.last = index
+
+            return result
 
         raise DateTimeParseError(f"Provided value {value!r} does not match any known datetime format")
 
+    def _from_timestamp(self, value: TParseDateTime, seconds: Union[int, float] = 0, microseconds: int = 0) -> datetime:
+        try:
+            t = _EPOCH_UTC + timedelta(seconds=seconds, microseconds=microseconds)
+
+            if self._numeric_utc:
+                return t
+            else:
+                return t.astimezone()
+        except (OverflowError, ValueError) as ex:
+            raise DateTimeParseError(f"Provided value {value!r} is out of range: {ex}") from None
+
+
+def _timestamp_ns(timestamp_match: Match[str]) -> int:
+    # Scale the integer and fractional parts separately to avoid float rounding, digits beyond 1ns are truncated
+    digits = _TIMESTAMP_DIGITS[timestamp_match[2]]
+    integer, _, fraction = timestamp_match[1].partition('.')
+
+    return int(integer) * 10 ** digits + int(fraction[:digits].ljust(digits, '0') or 0)
+
+
+_PARSERS = {
+    True: DateTimeParser(numeric_utc=True),
+    False: DateTimeParser(numeric_utc=False)
+}
+
+
+def parse_datetime(value: TParseDateTime, numeric_utc: bool = True) -> datetime:
+    """ Date/time or timestamp parser for use with argparse. The most recently matched format in the current thread is
+    tried first.
+
+    :param value: input
+    :param numeric_utc: if True treat numeric values as UTC based, otherwise assume local
+    :return: datetime
+    :raises ValueError: on invalid input
+    """
+    return _PARSERS[numeric_utc](value)
+
+
+def parse_timestamp_ns(value: TParseDateTime) -> int:
+    """ Date/time or timestamp parser returning integer nanoseconds since the epoch. Timestamp strings are parsed using
+    integer arithmetic only, so nanosecond timestamps such as '1690000000123456789n' are exact. Naive date/times are
+    treated as UTC.
+
+    :param value: input
+    :return: nanoseconds since the epoch
+    :raises ValueError: on invalid input
+    """
+    return _PARSERS[True].timestamp_ns(value)
+
+
+def parse_datetimes(values: Iterable[TParseDateTime], numeric_utc: bool = True,
+                    as_array: bool = True) -> Union[List[datetime], 'numpy.ndarray']:
+    """ Date/time or timestamp parser for many values. The most recently matched format is tried first for each value,
+    so a batch of a single format is only detected once.
+
+    If NumPy is installed the result is a datetime64[ns] array, timezone aware values are converted to UTC and
+    timestamps retain nanosecond precision.
+
+    :param values: input values
+    :param numeric_utc: if True treat numeric values as UTC based, otherwise assume local
+    :param as_array: if False a list is returned even if NumPy is installed
+    :return: datetime64[ns] array if NumPy is installed, otherwise list of datetimes
+    :raises ValueError: on invalid input, or if a value is outside the datetime64[ns] range
+    """
+    parser = DateTimeParser(numeric_utc=numeric_utc)
+
+    if as_array:
+        try:
+            import numpy
+        except ModuleNotFoundError:
+            as_array = False
+
+    if not as_array:
+        return [parser(value) for value in values]
+
+    # Timestamps are converted directly to nanoseconds without creating datetimes
+    timestamps = [parser.timestamp_ns(value) for value in values]
+
+    try:
+        return numpy.array(timestamps, dtype='int64').view('datetime64[ns]')
+    except OverflowError:
+        t = next(t for t in timestamps if not -2 ** 63 < t < 2 ** 63)
+        raise DateTimeParseError(f"Timestamp {t} ns is out of range for datetime64[ns]") from None
+
 
 def time_round(t: datetime, nearest: timedelta) -> datetime:
     """ Round datetime to nearest interval defined as a timedelta.
@@ -112,3 +504,82 @@ def time_round(t: datetime, nearest: timedelta) -> datetime:
         return (t.astimezone(timezone.utc) - timedelta(seconds=dt)).astimezone(t.tzinfo)
     else:
         return t - timedelta(seconds=dt)
+
+
+# Aggregators as functions to combine a value into the current state and to get the result from the state and count
+_RESAMPLE_AGGREGATORS: Dict[str, Tuple[Callable[[Any, Any], Any], Callable[[Any, int], Any]]] = {
+    'mean': (operator.add, lambda state, count: state / count),
+    'sum': (operator.add, lambda state, count: state),
+    'min': (min, lambda state, count: state),
+    'max': (max, lambda state, count: state),
+    'first': (lambda state, value: state, lambda state, count: state),
+    'last': (lambda state, value: value, lambda state, count: state),
+    'count': (lambda state, value: state, lambda state, count: count)
+}
+
+
+def resample(data: Iterable[TSample], interval: timedelta, key: Optional[Callable[[TSample], datetime]] = None,
+             value: Optional[Callable[[TSample], Any]] = None, agg: str = 'mean') -> Iterator[Tuple[datetime, Any]]:
+    """ Group consecutive samples into intervals and aggregate the values in each interval. Samples are grouped by the
+    result of rounding their time with time_round, which is calculated using integer arithmetic. Only consecutive
+    samples are grouped, so samples should be sorted by time.
+
+    :param data: input samples, by default (datetime, value) tuples
+    :param interval: interval duration
+    :param key: function to get the time of a sample, by default the first element
+    :param value: function to get the value of a sample, by default the second element
+    :param agg: aggregation applied to values in each interval, one of 'mean', 'sum', 'min', 'max', 'first', 'last' or
+        'count'
+    :return: iterator of rounded interval times and aggregated values
+    """
+    try:
+        combine, result = _RESAMPLE_AGGREGATORS[agg]
+    except KeyError:
+        raise ValueError(f"Unknown aggregation {agg!r}") from None
+
+    interval_us = interval // _MICROSECOND
+
+    if interval_us <= 0:
+        raise ValueError('Interval must be greater than zero')
+
+    get_time = typing.cast(Callable[[TSample], datetime], operator.itemgetter(0)) if key is None else key
+    get_value = typing.cast(Callable[[TSample], Any], operator.itemgetter(1)) if value is None else value
+
+    bucket: Optional[int] = None
+    bucket_time = datetime.min
+    state: Any = None
+    count = 0
+
+    for sample in data:
+        t = get_time(sample)
+        v = get_value(sample)
+
+        # Round wall clock time (as time_round does) with ties rounded to even
+        t_us = ((((t.toordinal() - _EPOCH_ORDINAL) * 24 + t.hour) * 60 + t.minute) * 60 + t.second) * 1000000 + \
+            t.microsecond
+        n, remainder = divmod(t_us, interval_us)
+
+        if 2 * remainder > interval_us or (2 * remainder == interval_us and n & 1):
+            n += 1
+
+        if n == bucket:
+            state = combine(state, v)
+            count += 1
+            continue
+
+        if bucket is not None:
+            yield bucket_time, result(state, count)
+
+        delta = timedelta(microseconds=t_us - n * interval_us)
+
+        if t.tzinfo is not None:
+            bucket_time = (t.astimezone(timezone.utc) - delta).astimezone(t.tzinfo)
+        else:
+            bucket_time = t - delta
+
+        bucket = n
+        state = v
+        count = 1
+
+    if bucket is not None:
+        yield bucket_time, result(state, count)
@@ -1,6 +1,8 @@
 # -*- coding: utf-8 -*-
 import collections.abc
+import threading
 import unittest
+from collections import Counter, defaultdict
 
 from plenary import chain
 
@@ -132,3 +134,668 @@ class PriorityChainMapTestCase(unittest.TestCase):
                 'c': 3
             }
         )
+
+
+    def test_missing(self):
+        for kwargs in ({}, {'indexed': True}, {'cached': True}):
+            with self.subTest(**kwargs):
+                counter = Counter(a=1)
+                default = defaultdict(int, c=3)
+                m = chain.PriorityChainMap({'b': 2}, counter, default, **kwargs)
+
+                self.assertEqual(2, m['b'], 'default from __missing__ should not shadow lower priority mapping')
+                self.assertNotIn('z', m)
+                self.assertIsNone(m.get('z'))
+                self.assertDictEqual({'a': 1, 'b': 2, 'c': 3}, m.to_dict())
+                self.assertNotIn('z', default, 'defaultdict should not be populated by lookups')
+
+
+class IndexedPriorityChainMapTestCase(unittest.TestCase):
+    def test_empty(self):
+        m = chain.PriorityChainMap(indexed=True)
+
+        self.assertTrue(m.indexed)
+        self.assertNotIn('z', m)
+        self.assertEqual(0, len(m))
+        self.assertEqual(0, m.version)
+
+    def test_insert(self):
+        m = chain.PriorityChainMap(
+            {
+                'a': 1,
+                'b': 2
+            },
+            indexed=True
+        )
+
+        self.assertEqual(1, m.version)
+
+        m.insert(
+            {
+                'a': 10,
+                'c': 3
+            }
+        )
+
+        m.insert(
+            {
+                'b': -20
+            },
+            1
+        )
+
+        self.assertEqual(3, m.version)
+        self.assertIn('a', m, 'key should exist')
+        self.assertNotIn('z', m, 'key should not exist')
+        self.assertCountEqual(list(m.keys()), ['a', 'b', 'c'])
+
+        self.assertEqual(10, m['a'], 'value should be overwritten by later insertion')
+        self.assertEqual(2, m['b'], 'value should not be overwritten by lower priority insertion')
+        self.assertEqual(3, m['c'], 'value should match expected value')
+
+        self.assertEqual(3, len(m))
+
+        with self.assertRaises(KeyError):
+            _ = m['z']
+
+    def test_order(self):
+        m = chain.PriorityChainMap(indexed=True)
+
+        m.insert(
+            {
+                'a': 1
+            },
+            append=True
+        )
+
+        m.insert(
+            {
+                'a': 10,
+                'b': 2
+            },
+            append=True
+        )
+
+        m.insert(
+            {
+                'b': 20
+            },
+            -1,
+            append=True
+        )
+
+        self.assertEqual(1, m['a'], 'value should not be overwritten by appended insertion')
+        self.assertEqual(20, m['b'], 'value should be overwritten by higher priority insertion')
+
+    def test_insert_many(self):
+        indexed = chain.PriorityChainMap(indexed=True)
+        unindexed = chain.PriorityChainMap()
+
+        for n in range(50):
+            layer = {k: n for k in range(n % 7, 40, n % 5 + 1)}
+            order = n % 3 - 1
+            append = n % 2 == 0
+
+            indexed.insert(layer, order, append)
+            unindexed.insert(layer, order, append)
+
+        indexed.insert(indexed.to_dict(), 5, append=True)
+
+        self.assertDictEqual(unindexed.provenance(), indexed.provenance())
+        self.assertDictEqual(unindexed.to_dict(), indexed.to_dict())
+
+
+class CachedPriorityChainMapTestCase(unittest.TestCase):
+    def test_lookup(self):
+        m = chain.PriorityChainMap(
+            {
+                'a': 1,
+                'b': 2
+            },
+            cached=True
+        )
+
+        self.assertEqual(1, m['a'])
+        self.assertNotIn('c', m, 'key should not exist')
+
+        m.insert(
+            {
+                'a': 10,
+                'c': 3
+            }
+        )
+
+        self.assertEqual(10, m['a'], 'cached value should be replaced by later insertion')
+        self.assertEqual(3, m['c'], 'cached miss should be replaced by later insertion')
+        self.assertEqual(2, m['b'], 'value should match expected value')
+
+        with self.assertRaises(KeyError):
+            _ = m['z']
+
+    def test_miss(self):
+        m = chain.PriorityChainMap(
+            {
+                'a': 1
+            },
+            cached=True
+        )
+
+        for n in range(1000):
+            self.assertNotIn(n, m)
+            self.assertIsNone(m.get(n))
+
+        m.get_many(range(1000, 2000))
+
+        self.assertEqual(1, m['a'])
+        self.assertEqual(1, len(m._cache), 'misses should not be cached')
+
+    def test_invalidate(self):
+        for indexed in (False, True):
+            with self.subTest(indexed=indexed):
+                layer = {
+                    'a': 10,
+                    'b': 20
+                }
+
+                m = chain.PriorityChainMap(
+                    {
+                        'a': 1,
+                        'c': 3
+                    },
+                    layer,
+                    indexed=indexed,
+                    cached=True
+                )
+
+                self.assertEqual(10, m['a'])
+                self.assertEqual(20, m['b'])
+                self.assertNotIn('d', m)
+
+                version = m.version
+
+                del layer['a']
+                del layer['b']
+                layer['d'] = 40
+                m.invalidate(layer)
+
+                self.assertGreater(m.version, version)
+                self.assertEqual(1, m['a'], 'value should revert to lower priority mapping')
+                self.assertNotIn('b', m, 'removed key should not exist')
+                self.assertEqual(40, m['d'], 'added key should exist')
+                self.assertCountEqual(['a', 'c', 'd'], list(m))
+
+                layer['c'] = 30
+                m.invalidate()
+
+                self.assertEqual(30, m['c'], 'value should be overwritten after full invalidation')
+
+
+class GetManyTestCase(unittest.TestCase):
+    def test_get_many(self):
+        for kwargs in ({}, {'indexed': True}, {'cached': True}):
+            with self.subTest(**kwargs):
+                m = chain.PriorityChainMap(
+                    {
+                        'a': 1,
+                        'b': 2
+                    },
+                    {
+                        'a': 10,
+                        'c': 3
+                    },
+                    **kwargs
+                )
+
+                m.insert(
+                    {
+                        'b': -20
+                    },
+                    -1
+                )
+
+                # Prime cache with partial results
+                self.assertEqual(3, m['c'])
+                self.assertNotIn('z', m)
+
+                self.assertDictEqual(
+                    {
+                        'z': None,
+                        'a': 10,
+                        'b': -20,
+                        'c': 3
+                    },
+                    m.get_many(['z', 'a', 'b', 'c'])
+                )
+
+                self.assertDictEqual(
+                    {
+                        'a': 10,
+                        'y': 0
+                    },
+                    m.get_many(iter(['a', 'y']), 0)
+                )
+
+                self.assertEqual(-20, m['b'])
+                self.assertNotIn('y', m)
+
+
+class FreezeTestCase(unittest.TestCase):
+    def test_freeze(self):
+        layer = {
+            'a': 10,
+            'c': 3
+        }
+
+        m = chain.PriorityChainMap(
+            {
+                'a': 1,
+                'b': 2
+            },
+            layer
+        )
+
+        frozen = m.freeze()
+
+        self.assertDictEqual(
+            {
+                'a': 10,
+                'b': 2,
+                'c': 3
+            },
+            dict(frozen)
+        )
+
+        with self.assertRaises(TypeError):
+            frozen['a'] = 100
+
+        self.assertIs(frozen, m.freeze(), 'snapshot should be reused while chain is unchanged')
+
+        m.insert(
+            {
+                'b': -20
+            },
+            -1
+        )
+
+        self.assertEqual(2, frozen['b'], 'existing snapshot should not change')
+        self.assertEqual(-20, m.freeze()['b'], 'new snapshot should reflect insertion')
+
+        layer['c'] = 30
+        m.invalidate(layer)
+
+        self.assertEqual(30, m.freeze()['c'], 'new snapshot should reflect invalidated mapping')
+
+    def test_to_dict(self):
+        layer = {
+            'a': 1
+        }
+
+        m = chain.PriorityChainMap(layer)
+
+        self.assertDictEqual({'a': 1}, m.to_dict())
+
+        layer['b'] = 2
+
+        self.assertEqual(2, m['b'])
+        self.assertEqual(2, len(m))
+        self.assertDictEqual({'a': 1, 'b': 2}, m.to_dict(), 'dict should reflect modified mapping')
+
+
+class ModifyTestCase(unittest.TestCase):
+    _MODES = ({}, {'indexed': True}, {'cached': True})
+
+    def _create(self, **kwargs):
+        low = {
+            'a': 1,
+            'b': 2
+        }
+
+        high = {
+            'a': 10,
+            'c': 3
+        }
+
+        m = chain.PriorityChainMap(low, high, **kwargs)
+
+        # Populate any cached state
+        self.assertDictEqual({'a': 10, 'b': 2, 'c': 3}, m.get_many(['a', 'b', 'c']))
+        _ = m.freeze()
+
+        return m, low, high
+
+    def test_remove(self):
+        for kwargs in self._MODES:
+            with self.subTest(**kwargs):
+                m, low, high = self._create(**kwargs)
+
+                m.remove(high)
+
+                self.assertEqual(1, m['a'], 'value should revert to remaining mapping')
+                self.assertNotIn('c', m, 'removed key should not exist')
+                self.assertEqual(2, len(m))
+                self.assertDictEqual({'a': 1, 'b': 2}, m.to_dict())
+
+                m.remove(low)
+
+                self.assertEqual(0, len(m))
+                self.assertNotIn('a', m)
+
+                with self.assertRaises(ValueError):
+                    m.remove(low)
+
+    def test_replace(self):
+        for kwargs in self._MODES:
+            with self.subTest(**kwargs):
+                m, low, high = self._create(**kwargs)
+
+                m.replace(
+                    high,
+                    {
+                        'b': 20,
+                        'd': 4
+                    }
+                )
+
+                self.assertDictEqual({'a': 1, 'b': 20, 'd': 4}, m.to_dict())
+                self.assertNotIn('c', m, 'replaced key should not exist')
+
+                with self.assertRaises(ValueError):
+                    m.replace(high, low)
+
+    def test_move(self):
+        for kwargs in self._MODES:
+            with self.subTest(**kwargs):
+                m, low, high = self._create(**kwargs)
+
+                m.move(low, -1)
+
+                self.assertEqual(1, m['a'], 'value should be supplied by moved mapping')
+                self.assertDictEqual({'a': 1, 'b': 2, 'c': 3}, m.to_dict())
+
+                m.move(low, 0, append=True)
+
+                self.assertEqual(10, m['a'], 'value should be supplied by original mapping')
+
+                m.move(high, 1)
+
+                self.assertEqual(1, m['a'], 'value should be supplied by moved mapping')
+                self.assertEqual(3, len(m))
+
+
+class LazyTestCase(unittest.TestCase):
+    def test_lazy(self):
+        for kwargs in ({}, {'cached': True}):
+            with self.subTest(**kwargs):
+                calls = []
+
+                def loader():
+                    calls.append(None)
+
+                    return {
+                        'a': 1,
+                        'b': 2
+                    }
+
+                m = chain.PriorityChainMap(
+                    loader,
+                    {
+                        'a': 10
+                    },
+                    **kwargs
+                )
+
+                self.assertEqual(10, m['a'], 'value should be supplied by higher priority mapping')
+                self.assertEqual(0, len(calls), 'loader should not be called until required')
+
+                self.assertEqual(2, m['b'], 'value should be supplied by loaded mapping')
+                self.assertDictEqual({'a': 10, 'b': 2}, m.to_dict())
+                self.assertEqual(1, len(calls), 'loader should only be called once')
+
+                m.remove(loader)
+
+                self.assertNotIn('b', m, 'removed key should not exist')
+
+    def test_lazy_cached_insert(self):
+        m = chain.PriorityChainMap(
+            {
+                'a': 1
+            },
+            cached=True
+        )
+
+        self.assertEqual(1, m['a'])
+        self.assertNotIn('b', m)
+
+        m.insert(lambda: {'a': 10, 'b': 20})
+
+        self.assertEqual(10, m['a'], 'cached value should be shadowed by loaded mapping')
+        self.assertEqual(20, m['b'], 'cached miss should be supplied by loaded mapping')
+
+    def test_lazy_indexed(self):
+        calls = []
+
+        def loader():
+            calls.append(None)
+
+            return {
+                'a': 1
+            }
+
+        m = chain.PriorityChainMap(loader, indexed=True)
+
+        self.assertEqual(1, len(calls), 'loader should be called on insertion into an indexed chain')
+        self.assertEqual(1, m['a'])
+
+        m.replace(loader, {'b': 2})
+
+        self.assertNotIn('a', m, 'replaced key should not exist')
+        self.assertEqual(2, m['b'])
+
+    def test_invalid(self):
+        with self.assertRaises(TypeError):
+            chain.PriorityChainMap(1)
+
+
+class NestedTestCase(unittest.TestCase):
+    _MODES = ({}, {'indexed': True}, {'cached': True})
+
+    def test_nested(self):
+        for kwargs in self._MODES:
+            with self.subTest(**kwargs):
+                base = {
+                    'a': 1,
+                    'db': {
+                        'host': 'localhost',
+                        'port': 5432,
+                        'options': {
+                            'timeout': 10,
+                            'retry': 3
+                        }
+                    },
+                    'flag': {
+                        'x': 1
+                    }
+                }
+
+                override = {
+                    'db': {
+                        'host': 'remote',
+                        'options': {
+                            'timeout': 20
+                        }
+                    },
+                    'flag': False
+                }
+
+                m = chain.PriorityChainMap(base, override, nested=True, **kwargs)
+
+                self.assertTrue(m.nested)
+
+                db = m['db']
+                self.assertIsInstance(db, chain.PriorityChainMap)
+                self.assertIs(db, m['db'], 'nested chain should be reused')
+                self.assertEqual('remote', db['host'], 'nested value should be overwritten by later insertion')
+                self.assertEqual(5432, db['port'], 'nested value should be merged from earlier insertion')
+                self.assertEqual(20, m['db']['options']['timeout'])
+                self.assertEqual(3, m['db']['options']['retry'])
+                self.assertFalse(m['flag'], 'non-mapping value should shadow mapping')
+
+                expected = {
+                    'a': 1,
+                    'db': {
+                        'host': 'remote',
+                        'port': 5432,
+                        'options': {
+                            'timeout': 20,
+                            'retry': 3
+                        }
+                    },
+                    'flag': False
+                }
+
+                self.assertDictEqual(expected, m.to_dict())
+                self.assertEqual(20, m.freeze()['db']['options']['timeout'])
+                self.assertEqual(5432, m.get_many(['db'])['db']['port'])
+
+                m.insert(
+                    {
+                        'db': {
+                            'port': 1234
+                        }
+                    }
+                )
+
+                self.assertIsNot(db, m['db'], 'nested chain should be rebuilt after insertion')
+                self.assertEqual(1234, m['db']['port'])
+                self.assertEqual('remote', m['db']['host'])
+
+                override['db']['host'] = 'other'
+                m.invalidate(override)
+
+                self.assertEqual('other', m['db']['host'], 'nested chain should be rebuilt after invalidation')
+
+
+class ResolveTestCase(unittest.TestCase):
+    def test_resolve(self):
+        for kwargs in ({}, {'indexed': True}, {'cached': True}):
+            with self.subTest(**kwargs):
+                m = chain.PriorityChainMap(
+                    {
+                        'a': 1,
+                        'b': 2
+                    },
+                    {
+                        'a': 10,
+                        'c': 3
+                    },
+                    **kwargs
+                )
+
+                m.insert(
+                    {
+                        'b': -20
+                    },
+                    -1
+                )
+
+                m.insert(
+                    {
+                        'd': 4
+                    },
+                    1
+                )
+
+                self.assertEqual(chain.ChainResolution(10, 0, 0), m.resolve('a'))
+                self.assertEqual(chain.ChainResolution(-20, -1, 0), m.resolve('b'))
+                self.assertEqual((3, 0, 0), tuple(m.resolve('c')))
+                self.assertEqual(1, m.resolve('d').order)
+
+                with self.assertRaises(KeyError):
+                    m.resolve('z')
+
+                self.assertDictEqual(
+                    {
+                        'a': (0, 0),
+                        'b': (-1, 0),
+                        'c': (0, 0),
+                        'd': (1, 0)
+                    },
+                    m.provenance()
+                )
+
+                m.insert(
+                    {
+                        'c': 30,
+                        'e': 5
+                    },
+                    append=True
+                )
+
+                self.assertEqual(chain.ChainResolution(3, 0, 0), m.resolve('c'))
+                self.assertEqual(chain.ChainResolution(5, 0, 2), m.resolve('e'))
+                self.assertEqual(2, m.resolve('e').position)
+                self.assertEqual((0, 2), m.provenance()['e'])
+
+
+class ConcurrentPriorityChainMapTestCase(unittest.TestCase):
+    _READERS = 8
+    _WRITES = 200
+
+    def test_type(self):
+        self.assertTrue(issubclass(chain.ConcurrentPriorityChainMap, chain.PriorityChainMap))
+
+    def test_stress(self):
+        for kwargs in ({}, {'indexed': True}, {'cached': True}):
+            with self.subTest(**kwargs):
+                m = chain.ConcurrentPriorityChainMap(
+                    {
+                        'base': 0,
+                        'shared': 0
+                    },
+                    **kwargs
+                )
+
+                stop = threading.Event()
+                errors = []
+
+                def reader():
+                    try:
+                        while not stop.is_set():
+                            self.assertEqual(0, m['base'])
+                            self.assertIn(m['shared'], range(self._WRITES))
+                            self.assertIn('base', m)
+                            self.assertGreaterEqual(len(m), 2)
+                            self.assertIn('base', list(m))
+                            self.assertEqual(0, m.get_many(['base', 'shared'])['base'])
+                            self.assertEqual(0, m.freeze()['base'])
+                    except Exception as exc:
+                        errors.append(exc)
+
+                threads = [threading.Thread(target=reader) for _ in range(self._READERS)]
+
+                for thread in threads:
+                    thread.start()
+
+                layers = []
+
+                try:
+                    for n in range(1, self._WRITES):
+                        layer = {
+                            'shared': n,
+                            n: n
+                        }
+
+                        m.insert(layer)
+                        layers.append(layer)
+
+                        if len(layers) > 10:
+                            m.remove(layers.pop(0))
+                finally:
+                    stop.set()
+
+                    for thread in threads:
+                        thread.join()
+
+                self.assertListEqual([], errors)
+                self.assertEqual(self._WRITES - 1, m['shared'])
+                self.assertEqual(len(layers) + 2, len(m))
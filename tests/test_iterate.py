@@ -1,5 +1,12 @@
 # -*- coding: utf-8 -*-
+import asyncio
+import threading
+import time
 import unittest
+from array import array
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta, timezone
 
 from plenary import iterate
 
@@ -168,6 +175,83 @@ class FlattenTestCase(unittest.TestCase):
             'Incorrect flattening of iterables within list'
         )
 
+    def test_max_depth(self):
+        test_data = [1, [2, [3, [4]]], (5,)]
+
+        self.assertListEqual(
+            test_data,
+            list(iterate.flatten(test_data, max_depth=0)),
+            'Incorrect flattening with zero depth'
+        )
+
+        self.assertListEqual(
+            [1, 2, [3, [4]], 5],
+            list(iterate.flatten(test_data, max_depth=1)),
+            'Incorrect flattening with limited depth'
+        )
+
+        self.assertListEqual(
+            [1, 2, 3, [4], 5],
+            list(iterate.flatten(test_data, max_depth=2)),
+            'Incorrect flattening with limited depth'
+        )
+
+    def test_deep(self):
+        test_data = [0]
+
+        for n in range(1, 5000):
+            test_data = [test_data, n]
+
+        self.assertListEqual(
+            list(range(5000)),
+            list(iterate.flatten(test_data)),
+            'Incorrect flattening of deeply nested lists'
+        )
+
+
+class FlattenRegisterTestCase(unittest.TestCase):
+    def setUp(self):
+        self._flatten_types = dict(iterate._flatten_types)
+
+    def tearDown(self):
+        # Restore in place as flatten holds a reference to the registry
+        iterate._flatten_types.clear()
+        iterate._flatten_types.update(self._flatten_types)
+
+    def test_leaf(self):
+        class Leaf(tuple):
+            pass
+
+        self.assertListEqual([1, 2], list(iterate.flatten([Leaf((1, 2))])))
+
+        iterate.register_flatten_leaf(Leaf)
+
+        self.assertListEqual(
+            [1, Leaf((2, 3)), 4],
+            list(iterate.flatten([1, [Leaf((2, 3))], 4])),
+            'Registered leaf type should not be flattened'
+        )
+
+    def test_container(self):
+        class Container:
+            def __init__(self, *items):
+                self._items = items
+
+            def __iter__(self):
+                return iter(self._items)
+
+        iterate.register_flatten_container(Container)
+
+        self.assertListEqual(
+            [1, 2, 3, 4],
+            list(iterate.flatten([1, Container(2, [3]), 4])),
+            'Registered container type should be flattened'
+        )
+
+    def test_invalid_container(self):
+        with self.assertRaises(TypeError):
+            iterate.register_flatten_container(int)
+
 
 class ChunkTestCase(unittest.TestCase):
     def test_empty(self):
@@ -199,6 +283,104 @@ class ChunkTestCase(unittest.TestCase):
             'Incorrect chunking of long list'
         )
 
+    def test_chunking_iterator(self):
+        self.assertListEqual(
+            [
+                list(range(0, 32)),
+                list(range(32, 64)),
+                list(range(64, 96)),
+                list(range(96, 100))
+            ],
+            list(iterate.chunk((x for x in range(100)), 32)),
+            'Incorrect chunking of generator'
+        )
+
+        self.assertListEqual(
+            [],
+            list(iterate.chunk(iter([]), 32)),
+            'Incorrect chunking of empty generator'
+        )
+
+    def test_chunking_sliceable(self):
+        class Sliceable:
+            def __init__(self, data):
+                self.data = data
+
+            def __len__(self):
+                return len(self.data)
+
+            def __getitem__(self, item):
+                return Sliceable(self.data[item])
+
+        chunks = list(iterate.chunk(Sliceable(list(range(10))), 4))
+
+        for block in chunks:
+            self.assertIsInstance(block, Sliceable, 'Chunk should be a slice of the input')
+
+        self.assertListEqual(
+            [
+                [0, 1, 2, 3],
+                [4, 5, 6, 7],
+                [8, 9]
+            ],
+            [block.data for block in chunks]
+        )
+
+        self.assertListEqual([['a', 'b'], ['c']], list(iterate.chunk({'a': 1, 'b': 2, 'c': 3}, 2)))
+        self.assertListEqual([[0, 1], [2, 3], [4]], list(iterate.chunk(deque(range(5)), 2)))
+        self.assertListEqual([], list(iterate.chunk(deque(), 2)))
+
+    def test_chunking_reuse(self):
+        chunks = []
+        buffers = set()
+
+        for block in iterate.chunk(range(100), 32, reuse_buffer=True):
+            chunks.append(list(block))
+            buffers.add(id(block))
+
+        self.assertListEqual(
+            [
+                list(range(0, 32)),
+                list(range(32, 64)),
+                list(range(64, 96)),
+                list(range(96, 100))
+            ],
+            chunks,
+            'Incorrect chunking with reused buffer'
+        )
+
+        self.assertEqual(1, len(buffers), 'Buffer should be reused')
+
+    def test_chunking_buffer(self):
+        for test_data in (bytes(range(100)), bytearray(range(100)), array('h', range(100))):
+            with self.subTest(type(test_data).__name__):
+                chunks = list(iterate.chunk_buffer(test_data, 32))
+
+                for block in chunks:
+                    self.assertIsInstance(block, memoryview, 'Chunk should be a view')
+
+                self.assertListEqual(
+                    [
+                        list(range(0, 32)),
+                        list(range(32, 64)),
+                        list(range(64, 96)),
+                        list(range(96, 100))
+                    ],
+                    [block.tolist() for block in chunks],
+                    'Incorrect chunking of buffer'
+                )
+
+        with self.subTest('shared buffer'):
+            test_data = bytearray(64)
+            block = next(iterate.chunk_buffer(test_data, 32))
+            test_data[0] = 1
+
+            self.assertEqual(1, block[0], 'Chunk should share memory with source buffer')
+
+        with self.subTest('non-buffer'):
+            with self.assertRaises(TypeError):
+                list(iterate.chunk_buffer([0, 1, 2], 2))
+
 
 class PairTestCase(unittest.TestCase):
     def test_empty(self):
@@ -223,5 +405,495 @@ class PairTestCase(unittest.TestCase):
         )
 
 
+class WindowTestCase(unittest.TestCase):
+    def test_empty(self):
+        self.assertListEqual(
+            [],
+            list(iterate.window([], 3)),
+            'Incorrect windowing of empty list'
+        )
+
+        self.assertListEqual(
+            [],
+            list(iterate.window([1, 2], 3)),
+            'Incorrect windowing of short list'
+        )
+
+    def test_invalid(self):
+        with self.assertRaises(ValueError):
+            list(iterate.window([], 0))
+
+        with self.assertRaises(ValueError):
+            list(iterate.window([], 1, 0))
+
+    def test_window(self):
+        self.assertListEqual(
+            [(0, 1, 2), (1, 2, 3), (2, 3, 4)],
+            list(iterate.window(range(5), 3)),
+            'Incorrect windowing of range'
+        )
+
+        self.assertListEqual(
+            list(iterate.pair(range(10))),
+            list(iterate.window(range(10), 2)),
+            'Window of two should match pairing'
+        )
+
+    def test_step(self):
+        self.assertListEqual(
+            [(0, 1, 2), (2, 3, 4), (4, 5, 6)],
+            list(iterate.window(range(8), 3, 2)),
+            'Incorrect windowing with overlapping step'
+        )
+
+        self.assertListEqual(
+            [(0, 1), (5, 6)],
+            list(iterate.window(range(9), 2, 5)),
+            'Incorrect windowing with step larger than window'
+        )
+
+    def test_view(self):
+        windows = []
+
+        for view in iterate.window(range(5), 3, view=True):
+            self.assertNotIsInstance(view, tuple)
+            self.assertEqual(3, len(view))
+            self.assertEqual(view[-1], view[2])
+            self.assertEqual(tuple(view[1:]), view[1:])
+            windows.append(tuple(view))
+
+            with self.assertRaises(TypeError):
+                view[0] = 0
+
+        self.assertListEqual(
+            [(0, 1, 2), (1, 2, 3), (2, 3, 4)],
+            windows,
+            'Incorrect windowing with view'
+        )
+
+
+def _square(x):
+    return x * x
+
+
+def _fail(x):
+    if x == 50:
+        raise ValueError('Expected failure')
+
+    return x
+
+
+class ParallelMapTestCase(unittest.TestCase):
+    def test_invalid(self):
+        with self.assertRaises(ValueError):
+            list(iterate.parallel_map(_square, [], 8, 'potato'))
+
+        with self.assertRaises(ValueError):
+            list(iterate.parallel_map(_square, [], 0))
+
+    def test_ordered(self):
+        for executor in ('thread', 'process'):
+            with self.subTest(executor):
+                self.assertListEqual(
+                    [x * x for x in range(100)],
+                    list(iterate.parallel_map(_square, range(100), 8, executor, max_workers=2)),
+                    'Incorrect ordered parallel map'
+                )
+
+    def test_unordered(self):
+        self.assertCountEqual(
+            [x * x for x in range(100)],
+            list(iterate.parallel_map(_square, iter(range(100)), 8, ordered=False, max_workers=2)),
+            'Incorrect unordered parallel map'
+        )
+
+    def test_executor(self):
+        with ThreadPoolExecutor(2) as executor:
+            self.assertListEqual(
+                [x * x for x in range(10)],
+                list(iterate.parallel_map(_square, range(10), 3, executor)),
+                'Incorrect parallel map using existing executor'
+            )
+
+            # Executor should remain usable
+            self.assertEqual(4, executor.submit(_square, 2).result())
+
+    def test_backpressure(self):
+        consumed = []
+
+        def source():
+            for n in range(10000):
+                consumed.append(n)
+                yield n
+
+        results = iterate.parallel_map(_square, source(), 10, max_in_flight=4, max_workers=2)
+
+        self.assertEqual(0, next(results))
+        self.assertLessEqual(len(consumed), 5 * 10, 'Input should not be consumed beyond chunks in flight')
+
+        results.close()
+
+    def test_exception(self):
+        for ordered in (True, False):
+            with self.subTest(ordered=ordered):
+                with self.assertRaises(ValueError):
+                    list(iterate.parallel_map(_fail, range(100), 8, ordered=ordered, max_workers=2))
+
+
+async def _async_iter(iterable, delay=None):
+    for item in iterable:
+        if delay is not None:
+            await asyncio.sleep(delay)
+
+        yield item
+
+
+async def _async_list(async_iterable):
+    return [item async for item in async_iterable]
+
+
+class AsyncTestCase(unittest.TestCase):
+    def test_aflatten(self):
+        self.assertListEqual(
+            [1, 2, 3, 4, 5, 'hello'],
+            asyncio.run(_async_list(iterate.aflatten(_async_iter([1, [2, (3,)], _async_iter([4, [5]]), 'hello'])))),
+            'Incorrect flattening of asynchronous iterable'
+        )
+
+        self.assertListEqual(
+            [1, [2, (3,)], 4, [5]],
+            asyncio.run(_async_list(iterate.aflatten(_async_iter([1, [[2, (3,)]], _async_iter([4, [5]])]),
+                                                     max_depth=1))),
+            'Incorrect flattening of asynchronous iterable with limited depth'
+        )
+
+        self.assertListEqual(
+            list('ab'),
+            asyncio.run(_async_list(iterate.aflatten(_async_iter(['ab']), True))),
+            'Incorrect flattening of asynchronous iterable strings'
+        )
+
+    def test_achunk(self):
+        self.assertListEqual(
+            [list(range(0, 32)), list(range(32, 64)), list(range(64, 96)), list(range(96, 100))],
+            asyncio.run(_async_list(iterate.achunk(_async_iter(range(100)), 32))),
+            'Incorrect chunking of asynchronous iterable'
+        )
+
+        self.assertListEqual(
+            [list(range(0, 32)), list(range(32, 64)), list(range(64, 96)), list(range(96, 100))],
+            asyncio.run(_async_list(iterate.achunk(_async_iter(range(100)), 32, 10))),
+            'Incorrect chunking of asynchronous iterable with timeout'
+        )
+
+        self.assertListEqual(
+            [],
+            asyncio.run(_async_list(iterate.achunk(_async_iter([]), 32, 10))),
+            'Incorrect chunking of empty asynchronous iterable'
+        )
+
+        with self.assertRaises(ValueError):
+            asyncio.run(_async_list(iterate.achunk(_async_iter([]), 0)))
+
+    def test_achunk_timeout(self):
+        async def source():
+            for item in range(3):
+                yield item
+
+            await asyncio.sleep(0.2)
+
+            for item in range(3, 6):
+                yield item
+
+        self.assertListEqual(
+            [[0, 1, 2], [3, 4, 5]],
+            asyncio.run(_async_list(iterate.achunk(source(), 10, 0.05))),
+            'Partial chunk should be returned after timeout'
+        )
+
+    def test_achunk_close(self):
+        finished = []
+
+        async def source():
+            try:
+                for item in range(100):
+                    await asyncio.sleep(0.01)
+                    yield item
+            finally:
+                finished.append(True)
+
+        async def consume():
+            chunks = iterate.achunk(source(), 2, 1)
+
+            async for block in chunks:
+                await chunks.aclose()
+                return block
+
+        self.assertListEqual([0, 1], asyncio.run(consume()))
+        self.assertListEqual([True], finished, 'Source should be closed')
+
+    def test_apair(self):
+        self.assertListEqual(
+            [(1, 2), (2, 3), (3, 4)],
+            asyncio.run(_async_list(iterate.apair(_async_iter([1, 2, 3, 4])))),
+            'Incorrect pairing of asynchronous iterable'
+        )
+
+        self.assertListEqual(
+            [],
+            asyncio.run(_async_list(iterate.apair(_async_iter([])))),
+            'Incorrect pairing of empty asynchronous iterable'
+        )
+
+
+class BatchTestCase(unittest.TestCase):
+    def test_invalid(self):
+        with self.assertRaises(ValueError):
+            list(iterate.batch([], 0, 1))
+
+    def test_size(self):
+        self.assertListEqual(
+            [list(range(0, 32)), list(range(32, 64)), list(range(64, 96)), list(range(96, 100))],
+            list(iterate.batch(range(100), 32, 10)),
+            'Incorrect batching by size'
+        )
+
+        self.assertListEqual(
+            [],
+            list(iterate.batch([], 32, 10)),
+            'Incorrect batching of empty iterable'
+        )
+
+    def test_latency(self):
+        def source():
+            yield from range(3)
+            time.sleep(0.2)
+            yield from range(3, 6)
+
+        self.assertListEqual(
+            [[0, 1, 2], [3, 4, 5]],
+            list(iterate.batch(source(), 10, 0.05)),
+            'Partial batch should be returned after latency elapses'
+        )
+
+    def test_exception(self):
+        def source():
+            yield from range(3)
+            raise KeyError('Expected failure')
+
+        batches = iterate.batch(source(), 10, 10)
+
+        self.assertListEqual([0, 1, 2], next(batches), 'Elements before failure should be returned')
+
+        with self.assertRaises(KeyError):
+            next(batches)
+
+    def test_close(self):
+        stopped = threading.Event()
+
+        def source():
+            try:
+                for n in range(1000):
+                    yield n
+            finally:
+                stopped.set()
+
+        batches = iterate.batch(source(), 2, 10)
+        self.assertListEqual([0, 1], next(batches))
+        batches.close()
+
+        self.assertTrue(stopped.wait(5), 'Reader should stop after consumer closes')
+
+    def test_abatch(self):
+        async def source():
+            for item in range(3):
+                yield item
+
+            await asyncio.sleep(0.2)
+
+            for item in range(3, 6):
+                yield item
+
+        self.assertListEqual(
+            [[0, 1, 2], [3, 4, 5]],
+            asyncio.run(_async_list(iterate.abatch(source(), 10, 0.05))),
+            'Partial batch should be returned after latency elapses'
+        )
+
+
+class PrefetchTestCase(unittest.TestCase):
+    def test_invalid(self):
+        with self.assertRaises(ValueError):
+            list(iterate.prefetch([], 0))
+
+    def test_prefetch(self):
+        self.assertListEqual(
+            list(range(100)),
+            list(iterate.prefetch(range(100), 4)),
+            'Incorrect prefetching of range'
+        )
+
+        self.assertListEqual(
+            [],
+            list(iterate.prefetch([])),
+            'Incorrect prefetching of empty list'
+        )
+
+    def test_read_ahead(self):
+        produced = []
+
+        def source():
+            for n in range(10):
+                produced.append(threading.get_ident())
+                yield n
+
+        items = iterate.prefetch(source(), 4)
+        self.assertEqual(0, next(items))
+
+        # Producer should fill the queue without further requests
+        deadline = time.monotonic() + 5
+
+        while len(produced) < 5 and time.monotonic() < deadline:
+            time.sleep(0.01)
+
+        self.assertGreaterEqual(len(produced), 5, 'Producer should read ahead')
+        self.assertNotIn(threading.get_ident(), produced, 'Producer should run in another thread')
+        self.assertListEqual(list(range(1, 10)), list(items))
+
+    def test_exception(self):
+        def source():
+            yield from range(3)
+            raise KeyError('Expected failure')
+
+        items = iterate.prefetch(source())
+
+        self.assertListEqual([0, 1, 2], [next(items) for _ in range(3)])
+
+        with self.assertRaises(KeyError):
+            next(items)
+
+    def test_close(self):
+        stopped = threading.Event()
+
+        def source():
+            try:
+                for n in range(1000):
+                    yield n
+            finally:
+                stopped.set()
+
+        items = iterate.prefetch(source(), 2)
+        self.assertEqual(0, next(items))
+        items.close()
+
+        self.assertTrue(stopped.wait(5), 'Producer should stop after consumer closes')
+
+
+class MergeSortedTestCase(unittest.TestCase):
+    def test_empty(self):
+        self.assertListEqual([], list(iterate.merge_sorted()))
+        self.assertListEqual([], list(iterate.merge_sorted([], iter([]))))
+
+    def test_merge(self):
+        self.assertListEqual(
+            list(range(10)),
+            list(iterate.merge_sorted([0, 3, 6, 9], iter([1, 4, 7]), (x for x in [2, 5, 8]))),
+            'Incorrect merge of sorted iterables'
+        )
+
+    def test_key_calls(self):
+        calls = []
+
+        def key(x):
+            calls.append(x)
+            return x
+
+        self.assertListEqual(list(range(10)), list(iterate.merge_sorted([0, 3, 6, 9], [1, 4, 7], [2, 5, 8], key=key)))
+        self.assertEqual(len(set(calls)), len(calls), 'Key should be computed once per element')
+
+    def test_stable(self):
+        self.assertListEqual(
+            [(0, 'a'), (0, 'b'), (1, 'b'), (1, 'a'), (2, 'a')],
+            list(iterate.merge_sorted([(0, 'a'), (2, 'a')], [(0, 'b'), (1, 'b')], [(1, 'a')], key=lambda x: x[0])),
+            'Merge should preserve iterable order for equal keys'
+        )
+
+    def test_datetime(self):
+        tz_a = timezone(timedelta(hours=10))
+        tz_b = timezone(timedelta(hours=-2))
+        base = datetime(2022, 8, 5, tzinfo=timezone.utc)
+
+        stream_a = [(base + timedelta(minutes=n * 2)).astimezone(tz_a) for n in range(10)]
+        stream_b = [(base + timedelta(minutes=n * 2 + 1)).astimezone(tz_b) for n in range(10)]
+        expected = sorted(stream_a + stream_b)
+
+        with self.subTest('datetime elements'):
+            self.assertListEqual(expected, list(iterate.merge_sorted(stream_a, stream_b)))
+
+        with self.subTest('datetime keys'):
+            self.assertListEqual(
+                [(t, None) for t in expected],
+                list(iterate.merge_sorted([(t, None) for t in stream_a], [(t, None) for t in stream_b],
+                                          key=lambda x: x[0]))
+            )
+
+        with self.subTest('naive datetime'):
+            with self.assertRaises(TypeError):
+                list(iterate.merge_sorted(stream_a, stream_b[:5] + [datetime(2022, 8, 5, 0, 10)] + stream_b[5:]))
+
+
+class UniqueTestCase(unittest.TestCase):
+    def test_invalid(self):
+        with self.assertRaises(ValueError):
+            list(iterate.unique([], max_items=0))
+
+        with self.assertRaises(ValueError):
+            list(iterate.unique([], error_rate=0.01))
+
+        with self.assertRaises(ValueError):
+            list(iterate.unique([], max_items=10, error_rate=1))
+
+    def test_unique(self):
+        self.assertListEqual(
+            [3, 1, 2, 4],
+            list(iterate.unique([3, 1, 3, 2, 1, 4, 4])),
+            'Incorrect removal of duplicates'
+        )
+
+        self.assertListEqual(
+            ['a', 'B', 'c'],
+            list(iterate.unique(['a', 'B', 'A', 'b', 'c'], key=str.lower)),
+            'Incorrect removal of duplicates by key'
+        )
+
+    def test_bounded(self):
+        self.assertListEqual(
+            [1, 2, 3, 1],
+            list(iterate.unique([1, 2, 2, 3, 1], max_items=2)),
+            'Duplicates beyond bound should not be removed'
+        )
+
+        self.assertListEqual(
+            [1, 2, 3],
+            list(iterate.unique([1, 2, 1, 3, 1], max_items=2)),
+            'Recently seen duplicates should be removed'
+        )
+
+    def test_approximate(self):
+        test_data = [n % 5000 for n in range(20000)]
+
+        result = list(iterate.unique(test_data, max_items=10000, error_rate=0.001))
+
+        self.assertEqual(len(set(result)), len(result), 'Duplicates should be removed')
+        self.assertGreater(len(result), 4950, 'False positives should be rare')
+
+    def test_approximate_rotation(self):
+        test_data = list(range(1000)) + list(range(1000))
+
+        result = list(iterate.unique(test_data, max_items=100, error_rate=0.001))
+
+        self.assertGreater(len(result), 1900, 'Keys beyond the filter bound should be forgotten')
+
+
 if __name__ == '__main__':
     unittest.main()
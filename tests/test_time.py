@@ -1,4 +1,5 @@
 # -*- coding: utf-8 -*-
+import threading
 import unittest
 from datetime import datetime, timedelta, timezone
 from typing import Optional
@@ -10,6 +11,11 @@ except ImportError:
     # noinspection PyPackageRequirements,PyUnresolvedReferences
     from backports.zoneinfo import ZoneInfo
 
+try:
+    import numpy
+except ModuleNotFoundError:
+    numpy = None
+
 from plenary import localtime
 
 
@@ -65,6 +71,219 @@ class ParseTestCase(unittest.TestCase):
             localtime.parse_datetime('cake')
 
 
+class ParseTimestampNsTestCase(unittest.TestCase):
+    def test_parse(self):
+        t_ns = 1659720405123456789
+
+        self.assertEqual(t_ns, localtime.parse_timestamp_ns('1659720405123456789n'))
+        self.assertEqual(t_ns, localtime.parse_timestamp_ns('1659720405123456.789u'))
+        self.assertEqual(t_ns, localtime.parse_timestamp_ns('1659720405123.456789m'))
+        self.assertEqual(t_ns, localtime.parse_timestamp_ns('1659720405.123456789'))
+        self.assertEqual(t_ns, localtime.parse_timestamp_ns('1659720405.1234567891s'))
+        self.assertEqual(1659720405000000000, localtime.parse_timestamp_ns('1659720405'))
+        self.assertEqual(1659720405000000000, localtime.parse_timestamp_ns('1659720405.'))
+        self.assertEqual(1659720405000000000, localtime.parse_timestamp_ns(1659720405))
+        self.assertEqual(1659720405500000000, localtime.parse_timestamp_ns(1659720405.5))
+
+    def test_datetime(self):
+        dt = datetime(2022, 8, 5, 17, 26, 45, 123456)
+
+        self.assertEqual(1659720405123456000, localtime.parse_timestamp_ns(dt))
+        self.assertEqual(1659720405123456000, localtime.parse_timestamp_ns(dt.replace(tzinfo=timezone.utc)))
+        self.assertEqual(1659720405123456000, localtime.parse_timestamp_ns('2022-08-05 17:26:45.123456'))
+        self.assertEqual(
+            1659720405123456000,
+            localtime.parse_timestamp_ns(dt.replace(hour=19, tzinfo=timezone(timedelta(hours=2))))
+        )
+
+        with self.assertRaises(localtime.DateTimeParseError):
+            localtime.parse_timestamp_ns('cake')
+
+    def test_out_of_range(self):
+        for value in ('99999999999999', 99999999999999, '253402300800', 1e300, float('inf'), '9' * 40 + 'n'):
+            with self.subTest(value=value):
+                with self.assertRaises(localtime.DateTimeParseError):
+                    localtime.parse_datetime(value)
+
+        with self.assertRaises(localtime.DateTimeParseError):
+            localtime.parse_timestamp_ns(float('inf'))
+
+    def test_datetime_precision(self):
+        dt = datetime(2023, 7, 22, 4, 26, 40, 123457, tzinfo=timezone.utc)
+
+        self.assertEqual(dt, localtime.parse_datetime('1690000000123456789n'))
+        self.assertEqual(dt.replace(microsecond=123456), localtime.parse_datetime('1690000000123456500n'))
+        self.assertEqual(dt.replace(microsecond=123458), localtime.parse_datetime('1690000000123457500n'))
+        self.assertEqual(dt, localtime.parse_datetime('1690000000.1234567'))
+
+
+class DateTimeParserTestCase(unittest.TestCase):
+    _DATETIME = datetime(2022, 8, 5, 17, 26, 45)
+
+    def test_formats(self):
+        parser = localtime.DateTimeParser()
+
+        self.assertEqual(self._DATETIME, parser('22-08-05 17:26:45'))
+        self.assertEqual(self._DATETIME, parser('220805_172645'))
+        self.assertEqual(self._DATETIME, parser('2022-08-05T17:26:45'))
+        self.assertEqual(self._DATETIME, parser('22-08-05 17:26:45'))
+        self.assertEqual(self._DATETIME, parser(self._DATETIME))
+
+        with self.assertRaises(localtime.DateTimeParseError):
+            parser('cake')
+
+    def test_precedence(self):
+        with self.subTest('default'):
+            expected = datetime(2011, 1, 1, 3, 4, 5)
+
+            self.assertEqual(expected, localtime.parse_datetime('201111_030405'))
+            self.assertEqual(datetime(2023, 1, 2, 3, 4, 5), localtime.parse_datetime('230102_030405'))
+            self.assertEqual(
+                expected,
+                localtime.parse_datetime('201111_030405'),
+                'earlier format should take precedence'
+            )
+
+        with self.subTest('custom'):
+            parser = localtime.DateTimeParser(['%d/%m/%Y', '%m/%d/%Y', '%Y.%m.%d'])
+
+            self.assertEqual(datetime(2022, 12, 13), parser('12/13/2022'))
+            self.assertEqual('%m/%d/%Y', parser.matched_format)
+            self.assertEqual(datetime(2022, 8, 5), parser('05/08/2022'), 'earlier format should take precedence')
+            self.assertEqual('%d/%m/%Y', parser.matched_format)
+            self.assertEqual(datetime(2022, 8, 5), parser('2022.08.05'))
+            self.assertEqual('%Y.%m.%d', parser.matched_format)
+            self.assertEqual(datetime(2022, 8, 5), parser('2022-08-05'))
+            self.assertIsNone(parser.matched_format)
+
+    def test_overlap(self):
+        formats = localtime._DATETIME_FORMATS
+
+        self.assertTrue(localtime._formats_overlap(*(localtime._format_slots(f) for f in formats[2:])))
+        self.assertFalse(localtime._formats_overlap(*(localtime._format_slots(f) for f in formats[:2])))
+        self.assertFalse(localtime._formats_overlap(*(localtime._format_slots(f) for f in formats[1:3])))
+        self.assertTrue(localtime._formats_overlap(localtime._format_slots('%H %M'), localtime._format_slots('%H  %M')))
+        self.assertTrue(localtime._formats_overlap(localtime._format_slots('%y%j'), localtime._format_slots('%H')))
+
+    def test_threads(self):
+        parser = localtime.DateTimeParser()
+        barrier = threading.Barrier(2)
+        matched = {}
+
+        def worker(value):
+            self.assertEqual(self._DATETIME, parser(value))
+            barrier.wait()
+
+            # Other thread has now matched a different format
+            matched[value] = parser.matched_format
+            self.assertEqual(self._DATETIME, parser(value))
+
+        threads = [threading.Thread(target=worker, args=(value,)) for value in ('22-08-05 17:26:45', '220805_172645')]
+
+        for thread in threads:
+            thread.start()
+
+        for thread in threads:
+            thread.join()
+
+        self.assertIsNone(parser.matched_format, 'no format should be matched in this thread')
+        self.assertDictEqual(
+            {
+                '22-08-05 17:26:45': '%y-%m-%d %H:%M:%S',
+                '220805_172645': '%y%m%d_%H%M%S'
+            },
+            matched
+        )
+
+    def test_custom(self):
+        parser = localtime.DateTimeParser(['%d/%m/%Y %H:%M:%S.%f', '%y-%j'])
+
+        self.assertEqual(self._DATETIME.replace(microsecond=5000), parser('05/08/2022 17:26:45.005'))
+        self.assertEqual(self._DATETIME.replace(microsecond=5000), parser('5/8/2022  17:26:45.005'))
+        self.assertEqual(datetime(2022, 2, 1), parser('22-032'))
+
+        with self.assertRaises(localtime.DateTimeParseError):
+            parser('220805_172645')
+
+    def test_compile(self):
+        values = {
+            '%Y-%m-%d %H:%M:%S': ['2022-08-05 17:26:45', '1999-12-31 23:59:59', '2022-08-05 17:26:4', '2022-8-5 1:2:3'],
+            '%y%m%d_%H%M%S': ['220805_172645', '680101_000000', '690101_000000', '220805_172645 ', '2208_17'],
+            '%d/%m/%Y %H:%M:%S.%f': ['05/08/2022 17:26:45.1', '05/08/2022 17:26:45.123456', '31/02/2022 17:26:45.0'],
+            '%Y%m%d %%': ['20220805 %', '20220805 %%', '20220805']
+        }
+
+        for datetime_format, format_values in values.items():
+            parser = localtime._compile_format(datetime_format)
+
+            for value in format_values:
+                with self.subTest(datetime_format=datetime_format, value=value):
+                    try:
+                        expected = datetime.strptime(value, datetime_format)
+                    except ValueError:
+                        with self.assertRaises(ValueError):
+                            parser(value)
+                    else:
+                        self.assertEqual(expected, parser(value))
+
+
+class ParseManyTestCase(unittest.TestCase):
+    _DATETIME = datetime(2022, 8, 5, 17, 26, 45)
+    _DATETIME_UTC = datetime(2022, 8, 5, 17, 26, 45, tzinfo=timezone.utc)
+
+    def test_list(self):
+        with self.subTest('str'):
+            self.assertListEqual(
+                [self._DATETIME, self._DATETIME + timedelta(seconds=1)],
+                localtime.parse_datetimes(['2022-08-05 17:26:45', '2022-08-05 17:26:46'], as_array=False)
+            )
+
+        with self.subTest('format'):
+            self.assertListEqual(
+                [self._DATETIME, self._DATETIME + timedelta(seconds=1)],
+                localtime.parse_datetimes(['20220805_172645', '20220805_172646'], as_array=False)
+            )
+
+        with self.subTest('numeric'):
+            self.assertListEqual(
+                [self._DATETIME_UTC, self._DATETIME_UTC + timedelta(seconds=1)],
+                localtime.parse_datetimes([1659720405, 1659720406.0], as_array=False)
+            )
+
+        with self.subTest('mixed'):
+            self.assertListEqual(
+                [self._DATETIME, self._DATETIME, self._DATETIME_UTC, self._DATETIME_UTC, self._DATETIME],
+                localtime.parse_datetimes(
+                    ['20220805_172645', '22-08-05 17:26:45', '1659720405000m', 1659720405, self._DATETIME],
+                    as_array=False
+                )
+            )
+
+        with self.subTest('empty'):
+            self.assertListEqual([], localtime.parse_datetimes([], as_array=False))
+
+    def test_invalid(self):
+        with self.assertRaises(localtime.DateTimeParseError):
+            localtime.parse_datetimes(['20220805_172645', 'cake'])
+
+    @unittest.skipIf(numpy is None, 'NumPy not installed')
+    def test_array(self):
+        result = localtime.parse_datetimes(['2022-08-05 17:26:45', 1659720405, '1659720405000000001n'])
+
+        self.assertEqual('datetime64[ns]', str(result.dtype))
+        self.assertListEqual(
+            ['2022-08-05T17:26:45.000000000', '2022-08-05T17:26:45.000000000', '2022-08-05T17:26:45.000000001'],
+            [str(t) for t in result]
+        )
+
+    @unittest.skipIf(numpy is None, 'NumPy not installed')
+    def test_array_out_of_range(self):
+        for value in (10 ** 20, '2300-01-01 00:00:00', datetime(1600, 1, 1)):
+            with self.subTest(value=value):
+                with self.assertRaises(localtime.DateTimeParseError):
+                    localtime.parse_datetimes([1659720405, value])
+
+
 class RoundingTestCase(unittest.TestCase):
     _DATETIME_ROUND_DOWN_MIN = datetime(2022, 6, 1, 0, 0, 0, 0)
     _DATETIME_ROUND_DOWN_MAX = datetime(2022, 6, 1, 11, 29, 29, 499999)
@@ -194,5 +413,71 @@ class RoundingTestCase(unittest.TestCase):
         )
 
 
+class ResampleTestCase(unittest.TestCase):
+    _BASE = datetime(2022, 6, 1, 12, 0, 0)
+
+    def _samples(self, tz=None):
+        base = self._BASE if tz is None else self._BASE.replace(tzinfo=tz)
+
+        return [(base + timedelta(seconds=n * 10), n) for n in range(20)]
+
+    def test_invalid(self):
+        with self.assertRaises(ValueError):
+            list(localtime.resample([], timedelta(minutes=1), agg='potato'))
+
+        with self.assertRaises(ValueError):
+            list(localtime.resample([], timedelta(0)))
+
+    def test_empty(self):
+        self.assertListEqual([], list(localtime.resample([], timedelta(minutes=1))))
+
+    def test_aggregate(self):
+        # Samples are grouped by nearest interval, ties (30 s and 150 s) are rounded to even
+        expected = {
+            'mean': [1.5, 6, 12, 17.5],
+            'sum': [6, 30, 84, 70],
+            'min': [0, 4, 9, 16],
+            'max': [3, 8, 15, 19],
+            'first': [0, 4, 9, 16],
+            'last': [3, 8, 15, 19],
+            'count': [4, 5, 7, 4]
+        }
+
+        for agg, values in expected.items():
+            with self.subTest(agg):
+                result = list(localtime.resample(self._samples(), timedelta(minutes=1), agg=agg))
+
+                self.assertListEqual(
+                    [(self._BASE + timedelta(minutes=n), value) for n, value in enumerate(values)],
+                    result
+                )
+
+    def test_time_round(self):
+        for tz in (None, timezone.utc, ZoneInfo('Australia/Melbourne')):
+            with self.subTest(tz=tz):
+                samples = self._samples(tz)
+                result = list(localtime.resample(samples, timedelta(seconds=30), agg='count'))
+
+                expected_times = []
+
+                for t, _ in samples:
+                    rounded = localtime.time_round(t, timedelta(seconds=30))
+
+                    if not expected_times or expected_times[-1] != rounded:
+                        expected_times.append(rounded)
+
+                self.assertListEqual(expected_times, [t for t, _ in result], 'Buckets should match time_round')
+                self.assertEqual(len(samples), sum(count for _, count in result))
+
+    def test_key(self):
+        samples = [{'time': t, 'value': v} for t, v in self._samples()]
+
+        self.assertListEqual(
+            [(self._BASE + timedelta(minutes=n), value) for n, value in enumerate([3, 8, 15, 19])],
+            list(localtime.resample(samples, timedelta(minutes=1), key=lambda s: s['time'],
+                                    value=lambda s: s['value'], agg='max'))
+        )
+
+
 if __name__ == '__main__':
     unittest.main()